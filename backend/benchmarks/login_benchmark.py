@@ -0,0 +1,83 @@
+# Login throughput benchmark: POST /login from `--concurrency` clients for
+# `--duration` seconds while other clients hit `--background-path`, then
+# report logins per second and latency percentiles for both. A slow
+# background p99 during the run means the event loop is being blocked.
+#
+#   python benchmarks/login_benchmark.py --base-url http://localhost:8000 \
+#       --email bench@example.com --password secret --register
+import argparse
+import asyncio
+import time
+
+import httpx
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def report(name, latencies, errors, elapsed):
+    print(
+        f"{name}: {len(latencies)} ok, {errors} failed, {len(latencies) / elapsed:.1f}/s, "
+        f"p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+        f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms, "
+        f"max {max(latencies, default=0) * 1000:.1f} ms"
+    )
+
+
+async def worker(client, method, path, payload, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=payload)
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors[0] += 1
+        except httpx.HTTPError:
+            errors[0] += 1
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.concurrency + args.background_concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        credentials = {"email": args.email, "password": args.password}
+        if args.register:
+            # 400 when the user already exists
+            await client.post("/register", json=credentials)
+
+        response = await client.post("/login", json=credentials)
+        if response.status_code != 200:
+            raise SystemExit(f"Login failed ({response.status_code}): {response.text}")
+
+        logins, login_errors = [], [0]
+        background, background_errors = [], [0]
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(
+            *[worker(client, "POST", "/login", credentials, deadline, logins, login_errors)
+              for _ in range(args.concurrency)],
+            *[worker(client, "GET", args.background_path, None, deadline, background, background_errors)
+              for _ in range(args.background_concurrency)],
+        )
+        elapsed = time.perf_counter() - started
+
+    report("login", logins, login_errors[0], elapsed)
+    report(f"background {args.background_path}", background, background_errors[0], elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure login throughput and latency under concurrent traffic")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--register", action="store_true", help="Register the user first")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent login clients")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--background-path", default="/metrics/write-buffer",
+                        help="Cheap GET route requested alongside the logins")
+    parser.add_argument("--background-concurrency", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
@@ -13,6 +13,7 @@ from pydantic import BaseModel, Field
 import logging
 import requests
 from tavily import TavilyClient
+from services import llm_telemetry, rate_limiter, singleflight
 
 logger = logging.getLogger(__name__)
 
@@ -64,8 +65,20 @@ class BrandAnalysis(BaseModel):
 class DetailedWebScraper:
     @staticmethod
     async def scrape_with_jina(url: str) -> Dict[str, Any]:
+        return await singleflight.do(
+            singleflight.make_key("jina", singleflight.normalize_url(url)),
+            lambda: DetailedWebScraper._scrape_with_jina(url),
+            encode=lambda summary: summary,
+            decode=lambda summary: summary,
+            # fallback_scraper's {"error": ...}
+            should_share=lambda summary: "error" not in summary,
+        )
+
+    @staticmethod
+    async def _scrape_with_jina(url: str) -> Dict[str, Any]:
         headers = {"Authorization": f"Bearer {jina_api_key}"}
         try:
+            await rate_limiter.acquire("jina", jina_api_key)
             async with httpx.AsyncClient() as client:
                 response = await client.post("https://r.jina.ai", json={"url": url}, headers=headers)
             return response.json() if response.status_code == 200 else await DetailedWebScraper.fallback_scraper(url)
@@ -78,6 +91,14 @@ class DetailedWebScraper:
         return {"error": f"Failed to process scraping for {url}."}
 
 async def find_competitors_perplexity(name: str, product: str, location: str, website: str) -> List[CompetitorInfo]:
+    return await singleflight.do(
+        singleflight.make_key("perplexity", name, product, location, singleflight.normalize_url(website)),
+        lambda: _find_competitors_perplexity(name, product, location, website),
+        encode=lambda competitors: [comp.dict() for comp in competitors],
+        decode=lambda competitors: [CompetitorInfo(**comp) for comp in competitors],
+    )
+
+async def _find_competitors_perplexity(name: str, product: str, location: str, website: str) -> List[CompetitorInfo]:
     chat_perplexity = ChatPerplexity(api_key=perplexity_key)
     
     prompt = f"""As an industry expert, identify and describe five main competitors for {name} (website: {website}) in the {product} sector in {location}.
@@ -118,7 +139,12 @@ async def find_competitors_perplexity(name: str, product: str, location: str, we
     messages = [HumanMessage(content=prompt)]
     
     try:
-        response = await chat_perplexity.ainvoke(messages)
+        await rate_limiter.acquire("perplexity", perplexity_key)
+        async with llm_telemetry.track("chat", "perplexity", chat_perplexity.model) as call:
+            response = await chat_perplexity.ainvoke(messages)
+            # ChatPerplexity doesn't report usage: estimate it at about four characters per token
+            usage = response.usage_metadata or {"input_tokens": len(prompt) // 4, "output_tokens": len(response.content) // 4}
+            call.set_usage(usage.get("input_tokens"), usage.get("output_tokens"))
         
         json_start = response.content.find('[')
         json_end = response.content.rfind(']') + 1
@@ -216,10 +242,12 @@ class SocialMediaScraper:
                     run_input = {"profiles": [url]} 
 
                 # Faz a chamada ao scraper da Apify
+                await rate_limiter.acquire("apify", apify_token)
                 run = apify_client.actor(scraper_id).call(run_input=run_input)
 
                 if run.get("status") == "SUCCEEDED":
                     dataset_id = run.get("defaultDatasetId")
+                    await rate_limiter.acquire("apify", apify_token)
                     items = apify_client.dataset(dataset_id).list_items().items
                     return items[:5]
                 else:
@@ -284,14 +312,25 @@ def parse_tavily_result(result: Any) -> List[TavilySearchResult]:
 async def search_with_tavily(urls: List[str]) -> List[List[TavilySearchResult]]:
     tavily_client = TavilyClient(api_key=tavily_api_key)
     
-    async def search_url(url):
+    async def fetch_url(url):
         try:
+            await rate_limiter.acquire("tavily", tavily_api_key)
             result = await asyncio.to_thread(tavily_client.get_search_context, url, search_depth="advanced")
             parsed_result = parse_tavily_result(result)
             return parsed_result
         except Exception as e:
             logger.error(f"Error in Tavily search for {url}: {str(e)}")
             return []
+
+    async def search_url(url):
+        return await singleflight.do(
+            singleflight.make_key("tavily", singleflight.normalize_url(url)),
+            lambda: fetch_url(url),
+            encode=lambda results: [result.dict() for result in results],
+            decode=lambda results: [TavilySearchResult(**result) for result in results],
+            # fetch_url returns [] on errors
+            should_share=bool,
+        )
     
     return await asyncio.gather(*[search_url(url) for url in urls])
 
@@ -300,7 +339,9 @@ async def fetch_social_media_data(social_links: List[str]) -> List[Dict]:
     
     async def fetch_data(link):
         try:
+            await rate_limiter.acquire("apify", apify_token)
             run = await asyncio.to_thread(client.actor("apify/social-media-scraper").call, run_input={"url": link})
+            await rate_limiter.acquire("apify", apify_token)
             return await asyncio.to_thread(run.fetch_output_dataset)
         except Exception as e:
             logger.error(f"Error fetching social media data for {link}: {str(e)}")
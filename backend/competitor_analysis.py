@@ -1,12 +1,6 @@
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
+import asyncio
 from langchain_community.document_loaders import WebBaseLoader
-from langchain_community.document_loaders import WebBaseLoader
-
-load_dotenv()
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from services import openai_client
 
 async def analyze_brand_voice(name: str, website: str, social_media: str):
     # Fetch website content
@@ -19,7 +13,7 @@ async def analyze_brand_voice(name: str, website: str, social_media: str):
     # print(f"Website content {website_content}")
 
     loader = WebBaseLoader(website)
-    docs = loader.load()
+    docs = await asyncio.to_thread(loader.load)
 
     website_content = " ".join(" ".join(doc.page_content.split()) for doc in docs)
     print(f"Website content: {website_content}")
@@ -92,7 +86,7 @@ async def analyze_brand_voice(name: str, website: str, social_media: str):
     # print(f"Social media content: {social_media_content}")
 
     # Analyze using OpenAI
-    response = client.chat.completions.create(
+    analysis = await openai_client.chat_completion(
         model="gpt-4o-2024-08-06",
         messages=[
             {"role": "system", "content": """
@@ -129,9 +123,8 @@ async def analyze_brand_voice(name: str, website: str, social_media: str):
             - [List 3-5 example phrases that embody the brand voice]
             """},
             {"role": "user", "content": f"Website content: {website_content}"}
-        ]
+        ],
+        cache_namespace="brand_voice"
     )
     
-    analysis = response.choices[0].message.content
-    
     return {"brand_voice_analysis": analysis}
\ No newline at end of file
@@ -1,10 +1,10 @@
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
+import asyncio
+import logging
+import anyio
+from config import settings
+from services import openai_client
 
-load_dotenv()
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger = logging.getLogger(__name__)
 
 PLATFORM_PROMPTS = {
     "Facebook": "Create engaging Facebook posts that encourage user interaction and sharing.",
@@ -15,46 +15,111 @@ PLATFORM_PROMPTS = {
     "YouTube": "Outline engaging YouTube video concepts with compelling titles and descriptions."
 }
 
-async def create_content(competitor_brand_voices, platforms, campaign_duration, posts_per_month, goals, reference_files=None):
-    content_plan = {}
+# Build the chat messages for a single platform
+def build_platform_messages(platform, competitor_brand_voices, campaign_duration, posts_per_month, goals, reference_files=None):
+    prompt = f"""
+    Create a {campaign_duration}-month content plan for {platform} with {posts_per_month} posts per month.
     
-    for platform in platforms:
-        prompt = f"""
-        Create a {campaign_duration}-month content plan for {platform} with {posts_per_month} posts per month.
-        
-        Consider the following competitor brand voices:
-        {' '.join(competitor_brand_voices)}
-        
-        Campaign goals: {', '.join(goals)}
-        
-        {PLATFORM_PROMPTS.get(platform, "Create engaging content for this platform.")}
-        
-        For each month, provide:
-        1. Monthly theme
-        2. Content ideas for each post (title/concept)
-        3. Relevant holidays or events to incorporate
-        4. Specific call-to-actions
-        
-        If applicable, include ideas for:
-        - Ad campaigns
-        - Email marketing campaigns
-        - Landing page concepts
-        
-        Ensure all content aligns with the brand voice and campaign goals.
-        """
-        
-        if reference_files:
-            prompt += f"\nReference files to consider: {', '.join(reference_files)}"
-        
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-2024-08-06",
-            messages=[
-                {"role": "system", "content": "You are an expert content creator and marketing strategist."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        content_plan[platform] = response.choices[0].message.content
+    Consider the following competitor brand voices:
+    {' '.join(competitor_brand_voices)}
+    
+    Campaign goals: {', '.join(goals)}
+    
+    {PLATFORM_PROMPTS.get(platform, "Create engaging content for this platform.")}
     
+    For each month, provide:
+    1. Monthly theme
+    2. Content ideas for each post (title/concept)
+    3. Relevant holidays or events to incorporate
+    4. Specific call-to-actions
+    
+    If applicable, include ideas for:
+    - Ad campaigns
+    - Email marketing campaigns
+    - Landing page concepts
+    
+    Ensure all content aligns with the brand voice and campaign goals.
+    """
+    
+    if reference_files:
+        prompt += f"\nReference files to consider: {', '.join(reference_files)}"
+
+    return [
+        {"role": "system", "content": "You are an expert content creator and marketing strategist."},
+        {"role": "user", "content": prompt}
+    ]
+
+async def create_content(competitor_brand_voices, platforms, campaign_duration, posts_per_month, goals, reference_files=None):
+    semaphore = asyncio.Semaphore(settings.CONTENT_PLATFORM_CONCURRENCY)
+
+    async def generate_platform_plan(platform):
+        messages = build_platform_messages(
+            platform, competitor_brand_voices, campaign_duration, posts_per_month, goals, reference_files
+        )
+        async with semaphore:
+            return await asyncio.wait_for(
+                openai_client.chat_completion(
+                    model="gpt-4o-2024-08-06",
+                    messages=messages,
+                    cache_namespace="content"
+                ),
+                timeout=settings.CONTENT_PLATFORM_TIMEOUT
+            )
+
+    # Platforms are generated concurrently; a failure or timeout on one
+    # platform is logged and left out instead of failing the whole plan
+    results = await asyncio.gather(
+        *[generate_platform_plan(platform) for platform in platforms],
+        return_exceptions=True
+    )
+
+    content_plan = {}
+    for platform, result in zip(platforms, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Error generating content plan for {platform}: {result!r}")
+            continue
+        content_plan[platform] = result
+
+    if platforms and not content_plan:
+        raise ValueError("Content generation failed for every requested platform")
+
     return content_plan
+
+# Stream the per-platform plans concurrently. Yields (platform, delta, error)
+# tuples as tokens arrive; each platform ends with a tuple whose delta is None,
+# carrying the exception if that platform failed.
+async def stream_content(competitor_brand_voices, platforms, campaign_duration, posts_per_month, goals, reference_files=None):
+    semaphore = asyncio.Semaphore(settings.CONTENT_PLATFORM_CONCURRENCY)
+    queue = asyncio.Queue()
+
+    async def stream_platform_plan(platform):
+        messages = build_platform_messages(
+            platform, competitor_brand_voices, campaign_duration, posts_per_month, goals, reference_files
+        )
+        try:
+            async with semaphore:
+                async for delta in openai_client.stream_chat_completion(
+                    model="gpt-4o-2024-08-06",
+                    messages=messages,
+                    cache_namespace="content"
+                ):
+                    await queue.put((platform, delta, None))
+            await queue.put((platform, None, None))
+        except Exception as e:
+            logger.error(f"Error streaming content plan for {platform}: {e!r}")
+            await queue.put((platform, None, e))
+
+    tasks = [asyncio.create_task(stream_platform_plan(platform)) for platform in platforms]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            item = await queue.get()
+            if item[1] is None:
+                remaining -= 1
+            yield item
+    finally:
+        # Stop the upstream streams if the consumer went away early
+        for task in tasks:
+            task.cancel()
+        with anyio.CancelScope(shield=True):
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -3,6 +3,9 @@ from bson import ObjectId
 from datetime import datetime
 from database.mongo import db
 from models.admin_painel import DashboardCreate
+from services import doc_cache
+from services.loaders import load_one
+from services.pagination import paginate
 
 
 # Helper function to format dashboard data
@@ -25,18 +28,25 @@ async def create_dashboard(dashboard: DashboardCreate):
             "created_at": datetime.now()
         }
 
-        result = db.dashboards.insert_one(dashboard_doc)
+        result = await db.dashboards.insert_one(dashboard_doc)
+        await doc_cache.invalidate_lists("dashboards")
         dashboard_doc["_id"] = result.inserted_id
         return dashboard_helper(dashboard_doc)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
-# Retrieve all dashboards
-async def get_dashboards(skip: int = 0, limit: int = 10):
+# Retrieve one page of dashboards and the cursor of the next page
+async def get_dashboards(limit: int = 10, cursor: str = None):
     try:
-        dashboards = list(db.dashboards.find().skip(skip).limit(limit))
-        return [dashboard_helper(dashboard) for dashboard in dashboards]
+        dashboards, next_cursor = await doc_cache.cached_list(
+            "dashboards",
+            {"limit": limit, "cursor": cursor},
+            lambda: paginate(db.dashboards, limit=limit, cursor=cursor)
+        )
+        return [dashboard_helper(dashboard) for dashboard in dashboards], next_cursor
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
@@ -46,7 +56,7 @@ async def get_dashboard_by_id(id: str):
         if not ObjectId.is_valid(id):
             raise HTTPException(status_code=400, detail="Invalid ObjectId")
 
-        dashboard = db.dashboards.find_one({"_id": ObjectId(id)})
+        dashboard = await load_one("dashboards", id)
         if dashboard:
             return dashboard_helper(dashboard)
         raise HTTPException(status_code=404, detail="Dashboard not found")
@@ -63,13 +73,14 @@ async def update_dashboard(id: str, dashboard: DashboardCreate):
         update_data = dashboard.dict(exclude_unset=True)
         update_data["updated_at"] = datetime.now()
 
-        update_result = db.dashboards.update_one(
+        update_result = await db.dashboards.update_one(
             {"_id": ObjectId(id)},
             {"$set": update_data}
         )
+        await doc_cache.invalidate("dashboards", id)
 
         if update_result.modified_count == 1:
-            updated_dashboard = db.dashboards.find_one({"_id": ObjectId(id)})
+            updated_dashboard = await db.dashboards.find_one({"_id": ObjectId(id)})
             return dashboard_helper(updated_dashboard)
         
         raise HTTPException(status_code=404, detail="Dashboard not found or no changes made.")
@@ -83,7 +94,8 @@ async def delete_dashboard(id: str):
         if not ObjectId.is_valid(id):
             raise HTTPException(status_code=400, detail="Invalid ObjectId")
 
-        result = db.dashboards.delete_one({"_id": ObjectId(id)})
+        result = await db.dashboards.delete_one({"_id": ObjectId(id)})
+        await doc_cache.invalidate("dashboards", id)
 
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Dashboard not found")
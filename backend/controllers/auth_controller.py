@@ -1,30 +1,25 @@
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
-from passlib.context import CryptContext
 from models.auth_model import User
-from sqlalchemy import text
+from services import users
+from services.passwords import hash_password
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-async def get_user_by_email(email: str, db: AsyncSession):
-    result = await db.execute(text("SELECT * FROM users WHERE email = :email"), {'email': email})
-    return result.fetchone()
+async def get_user_by_email(email: str, db: AsyncSession, use_cache: bool = True):
+    return await users.get_by_email(email, db, use_cache=use_cache)
 
 async def create_user(email: str, password: str, db: AsyncSession):
-    existing_user = await get_user_by_email(email, db)
+    existing_user = await get_user_by_email(email, db, use_cache=False)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = hash_password(password)
+    hashed_password = await hash_password(password)
     
     new_user = User(email=email, hashed_password=hashed_password) 
     
     db.add(new_user)
     await db.commit()
+    users.invalidate(email)
     await db.refresh(new_user)
     
     return new_user
@@ -3,18 +3,49 @@ from bson import ObjectId
 from models.brand_voice import BrandVoiceAnalysisInput, CompetitorBasicInfo
 from competitor_analysis import analyze_brand_voice  
 from typing import List
+from services import doc_cache
+from services.fieldsets import projection_for
+from services.loaders import load_one
+from services.pagination import paginate
 
-async def get_all_competitors():
-    competitors = db.brand_voices.find({}, {"name": 1, "website": 1, "social_media": 1, "brand_voice_analysis": 1})
-    return [
-        CompetitorBasicInfo(
-            id=str(comp["_id"]),
-            name=comp["name"],
-            website=comp["website"],
-            social_media=comp["social_media"],
-            brand_voice=comp["brand_voice_analysis"]
-        ) for comp in competitors
-    ]
+# API fields of a competitor and the document fields they are read from
+COMPETITOR_FIELDS = {
+    "id": "_id",
+    "name": "name",
+    "website": "website",
+    "social_media": "social_media",
+    "brand_voice": "brand_voice_analysis",
+}
+# List views leave out the brand voice analysis text; it is requested with
+# fields= or loaded by id
+COMPETITOR_SUMMARY_FIELDS = ("id", "name", "website", "social_media")
+
+
+def competitor_helper(comp, fields=COMPETITOR_SUMMARY_FIELDS) -> CompetitorBasicInfo:
+    values = {
+        "id": str(comp["_id"]),
+        "name": comp.get("name"),
+        "website": comp.get("website"),
+        "social_media": comp.get("social_media"),
+        "brand_voice": comp.get("brand_voice_analysis"),
+    }
+    # Only the requested fields are set, so routes can leave the others out
+    return CompetitorBasicInfo(**{field: values[field] for field in fields})
+
+
+# Returns one page of competitors and the cursor of the next page
+async def get_all_competitors(limit: int = None, cursor: str = None, fields=COMPETITOR_SUMMARY_FIELDS):
+    competitors, next_cursor = await doc_cache.cached_list(
+        "brand_voices",
+        {"limit": limit, "cursor": cursor, "fields": list(fields)},
+        lambda: paginate(
+            db.brand_voices,
+            projection=projection_for(fields, COMPETITOR_FIELDS),
+            limit=limit,
+            cursor=cursor
+        )
+    )
+    return [competitor_helper(comp, fields) for comp in competitors], next_cursor
 
 async def analyze_and_save_brand_voices(inputs: List[BrandVoiceAnalysisInput]):
     competitor_infos = []
@@ -28,7 +59,8 @@ async def analyze_and_save_brand_voices(inputs: List[BrandVoiceAnalysisInput]):
         }
         competitor_infos.append(competitor_info)
 
-    inserted_ids = db.brand_voices.insert_many(competitor_infos).inserted_ids
+    inserted_ids = (await db.brand_voices.insert_many(competitor_infos)).inserted_ids
+    await doc_cache.invalidate_lists("brand_voices")
 
     return [
         {
@@ -42,9 +74,15 @@ async def analyze_and_save_brand_voices(inputs: List[BrandVoiceAnalysisInput]):
     ]
 
 async def get_brand_voice_by_id(competitor_id: str):
-    brand_voice = db.brand_voices.find_one({"_id": ObjectId(competitor_id)})
+    brand_voice = await load_one("brand_voices", competitor_id)
     return brand_voice
 
+# Loads the requested fields (all of them by default) of one competitor
+async def get_competitor_fields_by_id(competitor_id: str, fields=tuple(COMPETITOR_FIELDS)):
+    comp = await load_one("brand_voices", competitor_id, projection_for(fields, COMPETITOR_FIELDS))
+    return competitor_helper(comp, fields) if comp else None
+
 async def delete_competitor(competitor_id: str):
-    result = db.brand_voices.delete_one({"_id": ObjectId(competitor_id)})
+    result = await db.brand_voices.delete_one({"_id": ObjectId(competitor_id)})
+    await doc_cache.invalidate("brand_voices", competitor_id)
     return result.deleted_count == 1
\ No newline at end of file
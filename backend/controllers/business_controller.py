@@ -1,41 +1,87 @@
+from config import settings
 from database.mongo import db
 from bson import ObjectId
 from models.business_voice import BusinessAnalysisInput, BusinessBasicInfo
 from business_analysis import analyze_business  
 from typing import List
+from pymongo import ASCENDING
+from services import blob_store, doc_cache
+from services.fieldsets import projection_for
+from services.loaders import load_one
+from services.pagination import paginate
 
 
-async def get_all_business():
-    business_cursor = db.business_analysis.find({}, {
-        "name": 1,
-        "website": 1,
-        "social_media": 1,
-        "product": 1,
-        "location": 1,
-        "competitors": 1,
-        "competitors_website_data": 1,
-        "social_media_summary": 1,
-        "website_urls": 1,
-        "extracted_social_links": 1
-    })
+# API fields of a business analysis and the document fields they are read from
+BUSINESS_FIELDS = {
+    "id": "_id",
+    "name": "name",
+    "website": "website",
+    "social_media": "social_media",
+    "product": "product",
+    "location": "location",
+    "website_urls": "website_urls",
+    "extracted_social_links": "extracted_social_links",
+    "competitors": "competitors",
+    "competitors_website_data": "competitors_website_data",
+    "social_media_summary": "social_media_summary",
+}
+# Scraped payloads kept in the blob store rather than in the document itself
+# (each page body of competitors_website_data, the whole social_media_summary)
+async def externalize_blobs(competitor_info: dict) -> dict:
+    stored = dict(competitor_info)
+    stored["competitors_website_data"] = [
+        {**page, "content": await blob_store.put(page["content"])} if isinstance(page, dict) and "content" in page else page
+        for page in competitor_info.get("competitors_website_data") or []
+    ]
+    stored["social_media_summary"] = await blob_store.put(competitor_info.get("social_media_summary"))
+    return stored
 
-    business = list(business_cursor)
 
-    return [
-        BusinessBasicInfo(
-            id=str(comp["_id"]),
-            name=comp["name"],
-            website=comp["website"],
-            social_media=comp["social_media"],
-            product=comp.get("product", ""),
-            location=comp.get("location", ""),
-            competitors=comp.get("competitors", []),
-            competitors_website_data=comp.get("competitors_website_data", []),
-            social_media_summary=comp.get("social_media_summary", []) if isinstance(comp.get("social_media_summary", []), list) else [comp.get("social_media_summary", {})],
-            website_urls=comp.get("website_urls", []),
-            extracted_social_links=comp.get("extracted_social_links", []) if isinstance(comp.get("extracted_social_links", []), list) else []
-        ) for comp in business
-    ]
+# List views leave out the scraped pages, social posts and competitor
+# profiles; those are requested with fields= or loaded by id
+BUSINESS_SUMMARY_FIELDS = ("id", "name", "website", "social_media", "product", "location", "website_urls", "extracted_social_links")
+
+
+def business_helper(comp, fields=BUSINESS_SUMMARY_FIELDS) -> BusinessBasicInfo:
+    values = {
+        "id": str(comp["_id"]),
+        "name": comp.get("name"),
+        "website": comp.get("website"),
+        "social_media": comp.get("social_media"),
+        "product": comp.get("product", ""),
+        "location": comp.get("location", ""),
+        "competitors": comp.get("competitors", []),
+        "competitors_website_data": comp.get("competitors_website_data", []),
+        "social_media_summary": comp.get("social_media_summary", []) if isinstance(comp.get("social_media_summary", []), list) else [comp.get("social_media_summary", {})],
+        "website_urls": comp.get("website_urls", []),
+        "extracted_social_links": comp.get("extracted_social_links", []) if isinstance(comp.get("extracted_social_links", []), list) else []
+    }
+    # Only the requested fields are set, so routes can leave the others out
+    return BusinessBasicInfo(**{field: values[field] for field in fields})
+
+
+# Returns one page of business analyses and the cursor of the next page
+async def get_all_business(limit: int = None, cursor: str = None, fields=BUSINESS_SUMMARY_FIELDS):
+    business, next_cursor = await doc_cache.cached_list(
+        "business_analysis",
+        {"limit": limit, "cursor": cursor, "fields": list(fields)},
+        lambda: paginate(
+            db.business_analysis, projection=projection_for(fields, BUSINESS_FIELDS), limit=limit, cursor=cursor
+        )
+    )
+    await blob_store.hydrate(business)
+    return [business_helper(comp, fields) for comp in business], next_cursor
+
+
+# Yields every business analysis in page order, one batch in memory at a time
+async def stream_business(fields=BUSINESS_SUMMARY_FIELDS):
+    cursor = db.business_analysis.find({}, projection_for(fields, BUSINESS_FIELDS)).sort("_id", ASCENDING).batch_size(settings.STREAM_BATCH_SIZE)
+    try:
+        async for comp in cursor:
+            await blob_store.hydrate([comp])
+            yield business_helper(comp, fields)
+    finally:
+        await cursor.close()
 
 
 async def analyze_and_save_business(inputs: List[BusinessAnalysisInput]):
@@ -67,7 +113,9 @@ async def analyze_and_save_business(inputs: List[BusinessAnalysisInput]):
         competitor_infos.append(competitor_info)
 
 
-    inserted_ids = db.business_analysis.insert_many(competitor_infos).inserted_ids
+    stored_infos = [await externalize_blobs(competitor_info) for competitor_info in competitor_infos]
+    inserted_ids = (await db.business_analysis.insert_many(stored_infos)).inserted_ids
+    await doc_cache.invalidate_lists("business_analysis")
 
     return [
         {
@@ -88,9 +136,23 @@ async def analyze_and_save_business(inputs: List[BusinessAnalysisInput]):
     ]
 
 async def get_business_analysis_by_id(competitor_id: str):
-    business_analysis = db.business_analysis.find_one({"_id": ObjectId(competitor_id)})
+    business_analysis = await load_one("business_analysis", competitor_id)
+    await blob_store.hydrate([business_analysis])
     return business_analysis
 
+# Loads the requested fields (all of them by default) of one business analysis
+async def get_business_fields_by_id(competitor_id: str, fields=tuple(BUSINESS_FIELDS)):
+    comp = await load_one("business_analysis", competitor_id, projection_for(fields, BUSINESS_FIELDS))
+    await blob_store.hydrate([comp])
+    return business_helper(comp, fields) if comp else None
+
 async def delete_business_analysis(competitor_id: str):
-    result = db.business_analysis.delete_one({"_id": ObjectId(competitor_id)})
-    return result.deleted_count == 1
\ No newline at end of file
+    business_analysis = await db.business_analysis.find_one_and_delete(
+        {"_id": ObjectId(competitor_id)},
+        projection={"competitors_website_data": 1, "social_media_summary": 1}
+    )
+    if business_analysis is None:
+        return False
+    await doc_cache.invalidate("business_analysis", competitor_id)
+    await blob_store.release([business_analysis])
+    return True
\ No newline at end of file
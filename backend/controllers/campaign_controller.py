@@ -2,13 +2,17 @@ import re
 from fastapi import HTTPException
 from database.mongo import db
 from bson import ObjectId
-from models.campaign import Campaign
+from models.campaign import Campaign, CampaignEvents
 from datetime import datetime
+from typing import List
 from zoneinfo import ZoneInfo
-from config import settings
-from openai import OpenAI, OpenAIError
+from openai import OpenAIError
+from services import campaign_metrics, openai_client, sse
+from services.fingerprint import compute_fingerprint
+from services.pagination import paginate
 
-openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+# Inputs that feed the generated content plan
+CONTENT_PLAN_FIELDS = ("name", "budget", "startDate", "endDate")
 
 # Helper function to transform a campaign document into a dictionary with specific fields
 def campaign_helper(campaign) -> dict:
@@ -22,56 +26,94 @@ def campaign_helper(campaign) -> dict:
         "created_at": campaign.get("created_at")
     }
 
+# Document of a new campaign, shared by the regular and the streaming creation
+def new_campaign_doc(campaign: Campaign, content_plan: str) -> dict:
+    return {
+        "name": campaign.name,
+        "budget": campaign.budget,
+        "startDate": campaign.startDate,
+        "endDate": campaign.endDate,
+        "content_plan": content_plan,
+        "content_plan_fingerprint": compute_fingerprint(campaign.dict(), CONTENT_PLAN_FIELDS),
+        "created_at": datetime.now(ZoneInfo("UTC"))
+    }
+
 # Function to create a new campaign in the database and generate a content plan
 async def create_campaign(campaign: Campaign):
     try:
         content_plan = await generate_content(campaign)
 
-        campaign_doc = {
-            "name": campaign.name,
-            "budget": campaign.budget,
-            "startDate": campaign.startDate,
-            "endDate": campaign.endDate,
-            "content_plan": content_plan,
-            "created_at": datetime.now(ZoneInfo("UTC"))
-        }
+        campaign_doc = new_campaign_doc(campaign, content_plan)
 
-        result = db.campaigns.insert_one(campaign_doc)
+        result = await db.campaigns.insert_one(campaign_doc)
 
         campaign_doc["_id"] = result.inserted_id
         return campaign_helper(campaign_doc)
     except Exception as e:
        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
-# Function to retrieve all campaigns from the database
-async def get_campaigns():
-    campaigns = list(db.campaigns.find())
-    return [campaign_helper(campaign) for campaign in campaigns]
+# Function to create a campaign while streaming the content plan as server-sent events.
+# The campaign is only saved once the stream completes.
+async def stream_campaign(campaign: Campaign):
+    parts = []
+    try:
+        async for delta in openai_client.stream_chat_completion(
+            model="gpt-4",
+            messages=build_campaign_messages(campaign),
+            cache_namespace="campaign"
+        ):
+            parts.append(delta)
+            yield sse.format_event({"delta": delta}, event="token")
+
+        campaign_doc = new_campaign_doc(campaign, "".join(parts))
+
+        result = await db.campaigns.insert_one(campaign_doc)
+        campaign_doc["_id"] = result.inserted_id
+        yield sse.format_event(campaign_helper(campaign_doc), event="done")
+
+    except Exception as e:
+        yield sse.format_event({"detail": f"An error occurred: {str(e)}"}, event="error")
+
+# Function to retrieve one page of campaigns and the cursor of the next page
+async def get_campaigns(limit: int = None, cursor: str = None):
+    campaigns, next_cursor = await paginate(db.campaigns, limit=limit, cursor=cursor)
+    return [campaign_helper(campaign) for campaign in campaigns], next_cursor
 
 # Function to retrieve a single campaign by its ID
 async def get_campaign_by_id(id: str):
-    campaign = db.campaigns.find_one({"_id": ObjectId(id)})
+    campaign = await db.campaigns.find_one({"_id": ObjectId(id)})
     return campaign
 
-# Function to update an existing campaign and regenerate the content plan
-async def update_campaign(id: str, campaign: Campaign):
+# Function to update an existing campaign. The content plan is only regenerated
+# when the inputs behind it changed, or when regenerate is set.
+async def update_campaign(id: str, campaign: Campaign, regenerate: bool = False):
     try:
-        content_plan = await generate_content(campaign)
-        
+        existing_campaign = await db.campaigns.find_one({"_id": ObjectId(id)}, {"content_plan_fingerprint": 1})
+        if not existing_campaign:
+            raise HTTPException(status_code=404, detail="Campaign not found")
+
         campaign_dict = campaign.dict(exclude_unset=True, by_alias=True)
-        campaign_dict["content_plan"] = content_plan
+        campaign_dict.pop("content_plan", None)
 
-        update_result = db.campaigns.update_one(
+        fingerprint = compute_fingerprint(campaign.dict(), CONTENT_PLAN_FIELDS)
+        if regenerate or existing_campaign.get("content_plan_fingerprint") != fingerprint:
+            campaign_dict["content_plan"] = await generate_content(campaign, use_cache=not regenerate)
+            campaign_dict["content_plan_fingerprint"] = fingerprint
+
+        update_result = await db.campaigns.update_one(
             {"_id": ObjectId(id)},
             {"$set": campaign_dict}
         )
 
-        if update_result.modified_count == 1:
-            updated_campaign = db.campaigns.find_one({"_id": ObjectId(id)})
+        # matched rather than modified: a cached content plan can leave the document unchanged
+        if update_result.matched_count == 1:
+            updated_campaign = await db.campaigns.find_one({"_id": ObjectId(id)})
             return campaign_helper(updated_campaign)
 
         raise HTTPException(status_code=404, detail="Campaign not found or no changes made.")
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
     
@@ -83,45 +125,58 @@ async def delete_campaign(id: str):
 
         object_id = ObjectId(id)
 
-        result = db.campaigns.delete_one({"_id": object_id})
+        result = await db.campaigns.delete_one({"_id": object_id})
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Campaign not found")
 
+        await campaign_metrics.delete_campaign_metrics(object_id)
+
         return {"message": "Campaign deleted successfully"}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
-# Function to retrieve analytics data (impressions, clicks, conversions) for all campaigns
-async def get_analytics_data():
-    campaigns = list(db.campaigns.find())
-    analytics_data = []
-    for campaign in campaigns:
-        analytics_data.append({
-            "name": campaign["name"],
-            "impressions": campaign.get("impressions", 0),
-            "clicks": campaign.get("clicks", 0),
-            "conversions": campaign.get("conversions", 0)
-        })
-    return analytics_data
+# Record impressions, clicks and conversions of a campaign
+async def record_campaign_events(id: str, events: CampaignEvents):
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=400, detail="Invalid ObjectId")
+    if await db.campaigns.count_documents({"_id": ObjectId(id)}, limit=1) == 0:
+        raise HTTPException(status_code=404, detail="Campaign not found")
 
-# Function to generate a content plan for a campaign using OpenAI's GPT-4 model
-async def generate_content(campaign: Campaign):
+    recorded = await campaign_metrics.record_events(
+        {"campaign_id": id, **event.dict()} for event in events.events
+    )
+    return {"recorded": recorded}
+
+# Campaign counters between start and end, read from the metric rollups
+async def get_analytics_data(start: datetime = None, end: datetime = None, campaign_ids: List[str] = None):
+    if campaign_ids and not all(ObjectId.is_valid(id) for id in campaign_ids):
+        raise HTTPException(status_code=400, detail="Invalid ObjectId")
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return await campaign_metrics.totals(start, end, campaign_ids)
+
+# Build the chat messages used to generate a campaign content plan
+def build_campaign_messages(campaign: Campaign):
     prompt = f"""
     Create a content plan for a campaign named {campaign.name} with a budget of {campaign.budget}.
     The campaign starts on {campaign.startDate} and ends on {campaign.endDate}.
     """
-    
-    response = openai_client.chat.completions.create(
+
+    return [
+        {"role": "system", "content": "You are an expert content creator and marketing strategist."},
+        {"role": "user", "content": prompt}
+    ]
+
+# Function to generate a content plan for a campaign using OpenAI's GPT-4 model
+async def generate_content(campaign: Campaign, use_cache: bool = True):
+    return await openai_client.chat_completion(
         model="gpt-4",
-        messages=[
-            {"role": "system", "content": "You are an expert content creator and marketing strategist."},
-            {"role": "user", "content": prompt}
-        ]
+        messages=build_campaign_messages(campaign),
+        cache_namespace="campaign",
+        use_cache=use_cache
     )
-    
-    return response.choices[0].message.content
 
 # Function to generate hypothetical analytics data (impressions, clicks, conversions) using OpenAI
 async def generate_analytics(campaign: Campaign):
@@ -139,35 +194,37 @@ async def generate_analytics(campaign: Campaign):
     """
 
     try:
-        response = openai_client.chat.completions.create(
+        analytics_text = await openai_client.chat_completion(
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are an expert marketing analyst."},
                 {"role": "user", "content": prompt}
-            ]
+            ],
+            cache_namespace="campaign",
+            validate=parse_analytics
         )
-
-        if not response or not response.choices:
-            raise ValueError("Failed to get a valid response from OpenAI API")
-
-        analytics_text = response.choices[0].message.content
         print("Analytics Text:", analytics_text)  
 
-        impressions_match = re.search(r"Impressions:\s*([\d,]+)", analytics_text)
-        clicks_match = re.search(r"Clicks:\s*([\d,]+)", analytics_text)
-        conversions_match = re.search(r"Conversions:\s*([\d,]+)", analytics_text)
-
-        if not (impressions_match and clicks_match and conversions_match):
-            print(f"Failed to extract analytics from response: {analytics_text}")
-            raise ValueError("Unable to extract analytics from the response")
-
-        impressions = int(impressions_match.group(1).replace(',', ''))
-        clicks = int(clicks_match.group(1).replace(',', ''))
-        conversions = int(conversions_match.group(1).replace(',', ''))
-
-        return impressions, clicks, conversions
+        return parse_analytics(analytics_text)
 
     except OpenAIError as e:
         raise ValueError(f"OpenAI API error: {str(e)}")
     except Exception as e:
         raise ValueError(f"An error occurred: {str(e)}")
+
+# Extract (impressions, clicks, conversions) from the analytics completion.
+# Raises ValueError when they are missing, so the completion is never cached.
+def parse_analytics(analytics_text: str):
+    impressions_match = re.search(r"Impressions:\s*([\d,]+)", analytics_text)
+    clicks_match = re.search(r"Clicks:\s*([\d,]+)", analytics_text)
+    conversions_match = re.search(r"Conversions:\s*([\d,]+)", analytics_text)
+
+    if not (impressions_match and clicks_match and conversions_match):
+        print(f"Failed to extract analytics from response: {analytics_text}")
+        raise ValueError("Unable to extract analytics from the response")
+
+    impressions = int(impressions_match.group(1).replace(',', ''))
+    clicks = int(clicks_match.group(1).replace(',', ''))
+    conversions = int(conversions_match.group(1).replace(',', ''))
+
+    return impressions, clicks, conversions
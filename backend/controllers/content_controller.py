@@ -1,9 +1,13 @@
+from config import settings
 from database.mongo import db
 from models.content import ContentCreatorInput, ContentBasicInfo
-from content_creation import create_content  
+from content_creation import create_content, stream_content
+from services import sse
+from services.loaders import load_many
+from services.pagination import paginate
 from datetime import datetime
 from typing import List
-from bson import ObjectId
+from pymongo import DESCENDING
 
 async def create_content_plan(input: ContentCreatorInput):
     # Fetch competitor brand voices
@@ -20,6 +24,9 @@ async def create_content_plan(input: ContentCreatorInput):
     )
     created_contents = []
     for platform in input.platforms:
+        # Platforms whose generation failed are missing from the plan
+        if platform not in result:
+            continue
         platformContent = result[platform]
         content_info = {
             "content": platformContent,
@@ -28,40 +35,91 @@ async def create_content_plan(input: ContentCreatorInput):
         }
         created_contents.append(content_info)
     
-    db.contents.insert_many(created_contents)
+    await db.contents.insert_many(created_contents)
     return result
 
-async def get_contents(content_type: str = None, single_content: bool = False):
+async def stream_content_plan(input: ContentCreatorInput):
+    try:
+        competitor_brand_voices = await get_competitor_brand_voices(input.competitors_ids)
+
+        plans = {platform: [] for platform in input.platforms}
+        failed = set()
+        async for platform, delta, error in stream_content(
+            competitor_brand_voices,
+            input.platforms,
+            input.campaign_duration,
+            input.posts_per_month,
+            input.goals,
+            input.reference_files
+        ):
+            if delta is not None:
+                plans[platform].append(delta)
+                yield sse.format_event({"platform": platform, "delta": delta}, event="token")
+            elif error is not None:
+                failed.add(platform)
+                yield sse.format_event({"platform": platform, "detail": str(error)}, event="error")
+
+        result = {
+            platform: "".join(parts)
+            for platform, parts in plans.items()
+            if platform not in failed
+        }
+        if result:
+            created_at = datetime.now().isoformat() + "Z"
+            await db.contents.insert_many([
+                {"content": content, "type": platform, "createdAt": created_at}
+                for platform, content in result.items()
+            ])
+        yield sse.format_event({"content_plan": result}, event="done")
+
+    except Exception as e:
+        yield sse.format_event({"detail": f"An error occurred: {str(e)}"}, event="error")
+
+def content_helper(content) -> ContentBasicInfo:
+    return ContentBasicInfo(
+        id=str(content["_id"]),
+        content=str(content["content"]),
+        type=str(content["type"]),
+        createdAt=str(content["createdAt"])
+    )
+
+# Returns the latest content when single_content is set, otherwise one page
+# of contents (newest first) and the cursor of the next page
+async def get_contents(content_type: str = None, single_content: bool = False, limit: int = None, cursor: str = None):
     query = {}
     if content_type:
         query['type'] = content_type
     
     if single_content:
-        content = db.contents.find_one(query, sort=[('createdAt', -1)])
+        content = await db.contents.find_one(query, sort=[('createdAt', -1)])
         if content:
-            return ContentBasicInfo(
-                id=str(content["_id"]),
-                content=str(content["content"]),
-                type=str(content["type"]),
-                createdAt=str(content["createdAt"])
-            )
+            return content_helper(content)
         else:
             return None
     else:
-        contents = db.contents.find(query).sort('createdAt', -1)
-        return [
-            ContentBasicInfo(
-                id=str(content["_id"]),
-                content=str(content["content"]),
-                type=str(content["type"]),
-                createdAt=str(content["createdAt"])
-            ) for content in contents
-        ]
+        contents, next_cursor = await paginate(
+            db.contents, query, sort_field="createdAt", direction=DESCENDING, limit=limit, cursor=cursor
+        )
+        return [content_helper(content) for content in contents], next_cursor
+
+# Yields every content (newest first), one batch in memory at a time
+async def stream_contents(content_type: str = None):
+    query = {}
+    if content_type:
+        query['type'] = content_type
+
+    cursor = db.contents.find(query).sort([('createdAt', DESCENDING), ('_id', DESCENDING)]).batch_size(settings.STREAM_BATCH_SIZE)
+    try:
+        async for content in cursor:
+            yield content_helper(content)
+    finally:
+        await cursor.close()
 
+# Loads the brand voices of all competitors in one query, in input order
 async def get_competitor_brand_voices(competitor_ids: List[str]) -> List[str]:
     brand_voices = []
-    for competitor_id in competitor_ids:
-        competitor = db.brand_voices.find_one({"_id": ObjectId(competitor_id)})
+    competitors = await load_many("brand_voices", competitor_ids, {"brand_voice_analysis": 1})
+    for competitor_id, competitor in zip(competitor_ids, competitors):
         if competitor and "brand_voice_analysis" in competitor:
             brand_voices.append(competitor["brand_voice_analysis"])
         else:
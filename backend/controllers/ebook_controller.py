@@ -2,9 +2,14 @@ from fastapi import HTTPException
 from bson import ObjectId
 from datetime import datetime
 from database.mongo import db
-from config import settings
-from openai import OpenAI
 from models.ebook import Ebook
+from services import openai_client, sse
+from services.fingerprint import compute_fingerprint
+from services.pagination import paginate
+import ebook_generation
+
+# Inputs that feed the generated content
+CONTENT_FIELDS = ("title", "theme", "category", "mode")
 
 # Helper function to format ebook data
 def ebook_helper(ebook) -> dict:
@@ -17,57 +22,251 @@ def ebook_helper(ebook) -> dict:
         "created_at": ebook["created_at"]
     }
 
+# Helper function to add chapter progress to ebooks generated chapter by chapter
+def chaptered_ebook_helper(ebook) -> dict:
+    return {
+        **ebook_helper(ebook),
+        "generation_status": ebook.get("generation_status"),
+        "chapters": [
+            {
+                "index": chapter["index"],
+                "title": chapter["title"],
+                "status": chapter["status"],
+                "error": chapter.get("error")
+            }
+            for chapter in ebook.get("chapters", [])
+        ]
+    }
+
+# Document of a new ebook generated in a single completion (the default mode).
+# Shared by every creation path so they store the same fields.
+def new_ebook_doc(ebook: Ebook, content: str) -> dict:
+    return {
+        "title": ebook.title,
+        "theme": ebook.theme,
+        "category": ebook.category,
+        "content": content,
+        "generation_mode": "single",
+        "content_fingerprint": compute_fingerprint(ebook.dict(), CONTENT_FIELDS),
+        "created_at": datetime.now()
+    }
+
 # Create a new ebook and generate content using AI
 async def create_ebook(ebook: Ebook):
+    if ebook.mode == "chapters":
+        return await create_chaptered_ebook(ebook)
+
     try:
         content = await generate_ebook_content(ebook)
         
-        ebook_doc = {
-            "title": ebook.title,
-            "theme": ebook.theme,
-            "category": ebook.category,
-            "content": content,
-            "created_at": datetime.now()
-        }
+        ebook_doc = new_ebook_doc(ebook, content)
         
-        result = db.ebooks.insert_one(ebook_doc)
+        result = await db.ebooks.insert_one(ebook_doc)
         ebook_doc["_id"] = result.inserted_id
         return ebook_helper(ebook_doc)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
-# Retrieve all ebooks
-async def get_ebooks():
-    ebooks = list(db.ebooks.find())
-    return [ebook_helper(ebook) for ebook in ebooks]
+# Create a new ebook from an outline, writing its chapters in parallel.
+# Progress is stored per chapter so a failed chapter can be retried alone.
+async def create_chaptered_ebook(ebook: Ebook):
+    try:
+        chapters = await generate_ebook_outline(ebook)
+
+        ebook_doc = {
+            **new_ebook_doc(ebook, ""),
+            "generation_mode": "chapters",
+            "generation_status": "generating",
+            "chapters": chapters
+        }
+
+        result = await db.ebooks.insert_one(ebook_doc)
+        return await write_ebook_chapters(
+            result.inserted_id, ebook.title, ebook.theme, ebook.category, chapters, range(len(chapters))
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+# Generate the outline and turn it into pending chapter entries
+async def generate_ebook_outline(ebook: Ebook, use_cache: bool = True):
+    outline = await ebook_generation.generate_outline(ebook.title, ebook.theme, ebook.category, use_cache=use_cache)
+    return [
+        {"index": index, "title": item["title"], "summary": item["summary"], "status": "pending", "content": None, "error": None}
+        for index, item in enumerate(outline)
+    ]
+
+async def write_ebook_chapters(ebook_id: ObjectId, title: str, theme: str, category: str, chapters, indices):
+    async def save_chapter(index, content, error):
+        await db.ebooks.update_one(
+            {"_id": ebook_id},
+            {"$set": {
+                f"chapters.{index}.status": "done" if error is None else "failed",
+                f"chapters.{index}.content": content,
+                f"chapters.{index}.error": error
+            }}
+        )
+
+    await ebook_generation.generate_chapters(title, theme, category, chapters, indices, on_chapter_done=save_chapter)
+
+    # Reassemble from the stored chapters so earlier successes are kept on retries
+    updated_ebook = await db.ebooks.find_one({"_id": ebook_id})
+    chapters = updated_ebook["chapters"]
+    done = sum(chapter["status"] == "done" for chapter in chapters)
+    if not done:
+        # Nothing to assemble: never report an empty book as complete
+        generation_status = "failed"
+    else:
+        generation_status = "complete" if done == len(chapters) else "partial"
+    content = ebook_generation.assemble_ebook(chapters)
+
+    await db.ebooks.update_one(
+        {"_id": ebook_id},
+        {"$set": {"content": content, "generation_status": generation_status}}
+    )
+    updated_ebook.update(content=content, generation_status=generation_status)
+    return chaptered_ebook_helper(updated_ebook)
+
+# Regenerate a single chapter of an ebook generated chapter by chapter
+async def retry_ebook_chapter(id: str, index: int):
+    try:
+        if not ObjectId.is_valid(id):
+            raise HTTPException(status_code=400, detail="Invalid ObjectId")
+
+        ebook = await db.ebooks.find_one({"_id": ObjectId(id)})
+        if not ebook:
+            raise HTTPException(status_code=404, detail="Ebook not found")
+        if ebook.get("generation_mode") != "chapters":
+            raise HTTPException(status_code=400, detail="Ebook was not generated chapter by chapter")
+        if index < 0 or index >= len(ebook["chapters"]):
+            raise HTTPException(status_code=404, detail="Chapter not found")
+
+        await db.ebooks.update_one(
+            {"_id": ebook["_id"]},
+            {"$set": {f"chapters.{index}.status": "pending", f"chapters.{index}.error": None, "generation_status": "generating"}}
+        )
+        return await write_ebook_chapters(
+            ebook["_id"], ebook["title"], ebook["theme"], ebook["category"], ebook["chapters"], [index]
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+# Create a new ebook, streaming the generated content as server-sent events.
+# The ebook is only saved once the stream completes. Single mode only: the
+# route rejects mode="chapters".
+async def stream_ebook(ebook: Ebook):
+    parts = []
+    try:
+        async for delta in openai_client.stream_chat_completion(
+            model="gpt-4",
+            messages=build_ebook_messages(ebook),
+            cache_namespace="ebook"
+        ):
+            parts.append(delta)
+            yield sse.format_event({"delta": delta}, event="token")
+
+        ebook_doc = new_ebook_doc(ebook, "".join(parts))
+
+        result = await db.ebooks.insert_one(ebook_doc)
+        ebook_doc["_id"] = result.inserted_id
+        yield sse.format_event(ebook_helper(ebook_doc), event="done")
+
+    except Exception as e:
+        yield sse.format_event({"detail": f"An error occurred: {str(e)}"}, event="error")
+
+# Retrieve one page of ebooks and the cursor of the next page
+async def get_ebooks(limit: int = None, cursor: str = None):
+    ebooks, next_cursor = await paginate(db.ebooks, limit=limit, cursor=cursor)
+    return [ebook_helper(ebook) for ebook in ebooks], next_cursor
 
 # Retrieve a single ebook by ID
 async def get_ebook_by_id(id: str):
-    ebook = db.ebooks.find_one({"_id": ObjectId(id)})
+    ebook = await db.ebooks.find_one({"_id": ObjectId(id)})
     if ebook:
+        if ebook.get("generation_mode") == "chapters":
+            return chaptered_ebook_helper(ebook)
         return ebook_helper(ebook)
     raise HTTPException(status_code=404, detail="Ebook not found")
 
-# Update an existing ebook
-async def update_ebook(id: str, ebook: Ebook):
+# Update an existing ebook. The content is only regenerated when the inputs
+# behind it changed, or when regenerate is set.
+async def update_ebook(id: str, ebook: Ebook, regenerate: bool = False):
+    if ebook.mode == "chapters":
+        return await update_chaptered_ebook(id, ebook, regenerate)
+
     try:
-        content = await generate_ebook_content(ebook)
-        
-        update_data = ebook.dict(exclude_unset=True)
-        update_data["content"] = content
+        existing_ebook = await db.ebooks.find_one({"_id": ObjectId(id)}, {"content_fingerprint": 1})
+        if not existing_ebook:
+            raise HTTPException(status_code=404, detail="Ebook not found")
 
-        update_result = db.ebooks.update_one(
+        update_data = ebook.dict(exclude_unset=True, exclude={"mode", "content"})
+
+        fingerprint = compute_fingerprint(ebook.dict(), CONTENT_FIELDS)
+        if regenerate or existing_ebook.get("content_fingerprint") != fingerprint:
+            update_data["content"] = await generate_ebook_content(ebook, use_cache=not regenerate)
+            update_data["content_fingerprint"] = fingerprint
+            # Switching back from chapter mode drops the chapter progress
+            update_data["generation_mode"] = "single"
+
+        update_result = await db.ebooks.update_one(
             {"_id": ObjectId(id)},
             {"$set": update_data}
         )
 
-        if update_result.modified_count == 1:
-            updated_ebook = db.ebooks.find_one({"_id": ObjectId(id)})
+        # matched rather than modified: cached content can leave the document unchanged
+        if update_result.matched_count == 1:
+            updated_ebook = await db.ebooks.find_one({"_id": ObjectId(id)})
             return ebook_helper(updated_ebook)
         
         raise HTTPException(status_code=404, detail="Ebook not found or no changes made.")
     
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+# Update an existing ebook and rewrite it from a new outline, chapter by chapter,
+# unless its inputs are unchanged and regenerate is not set
+async def update_chaptered_ebook(id: str, ebook: Ebook, regenerate: bool = False):
+    try:
+        if not ObjectId.is_valid(id):
+            raise HTTPException(status_code=400, detail="Invalid ObjectId")
+
+        existing_ebook = await db.ebooks.find_one({"_id": ObjectId(id)})
+        if not existing_ebook:
+            raise HTTPException(status_code=404, detail="Ebook not found")
+
+        update_data = ebook.dict(exclude_unset=True, exclude={"mode", "content"})
+
+        fingerprint = compute_fingerprint(ebook.dict(), CONTENT_FIELDS)
+        unchanged = existing_ebook.get("content_fingerprint") == fingerprint
+        if not regenerate and unchanged and existing_ebook.get("generation_mode") == "chapters":
+            await db.ebooks.update_one({"_id": ObjectId(id)}, {"$set": update_data})
+            existing_ebook.update(update_data)
+            return chaptered_ebook_helper(existing_ebook)
+
+        chapters = await generate_ebook_outline(ebook, use_cache=not regenerate)
+
+        update_data.update(
+            generation_mode="chapters",
+            generation_status="generating",
+            chapters=chapters,
+            content_fingerprint=fingerprint
+        )
+        await db.ebooks.update_one({"_id": ObjectId(id)}, {"$set": update_data})
+
+        return await write_ebook_chapters(
+            ObjectId(id), ebook.title, ebook.theme, ebook.category, chapters, range(len(chapters))
+        )
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
@@ -77,7 +276,7 @@ async def delete_ebook(id: str):
         if not ObjectId.is_valid(id):
             raise HTTPException(status_code=400, detail="Invalid ObjectId")
         
-        result = db.ebooks.delete_one({"_id": ObjectId(id)})
+        result = await db.ebooks.delete_one({"_id": ObjectId(id)})
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Ebook not found")
@@ -88,21 +287,24 @@ async def delete_ebook(id: str):
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
-openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+# Build the chat messages used to generate an ebook
+def build_ebook_messages(ebook: Ebook):
+    prompt = f"Generate detailed content for an ebook titled '{ebook.title}' on the theme '{ebook.theme}', in the '{ebook.category}' category."
+
+    return [
+        {"role": "system", "content": "You are an expert in ebook content creation."},
+        {"role": "user", "content": prompt}
+    ]
 
 # Function to generate ebook content using OpenAI's GPT-4 model
-async def generate_ebook_content(ebook: Ebook):
-    prompt = f"Generate detailed content for an ebook titled '{ebook.title}' on the theme '{ebook.theme}', in the '{ebook.category}' category."
-    
+async def generate_ebook_content(ebook: Ebook, use_cache: bool = True):
     try:
-        response = openai_client.chat.completions.create(
+        return await openai_client.chat_completion(
             model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert in ebook content creation."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=build_ebook_messages(ebook),
+            cache_namespace="ebook",
+            use_cache=use_cache
         )
-        return response.choices[0].message.content
     
     except Exception as e:
         raise ValueError(f"An error occurred while generating content: {str(e)}")
@@ -2,13 +2,9 @@ from datetime import datetime
 import os
 import httpx
 from fastapi import HTTPException
-from pymongo import MongoClient
 from models.image_generator import ImageGenerationRequest, ImageGenerationResponse
+from services import llm_telemetry, rate_limiter, write_buffer
 
-# MongoDB connection (usando variáveis de ambiente)
-mongodb_client = MongoClient(os.getenv("MONGODB_URI"))
-db = mongodb_client[os.getenv("DATABASE_NAME")]
-collection = db['image_generations']
 
 OPENAI_API_URL = "https://api.openai.com/v1/images/generations"
 
@@ -46,21 +42,27 @@ async def generate_image(request: ImageGenerationRequest) -> ImageGenerationResp
         f"with an aspect ratio of {aspect_ratio}."
     )
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            OPENAI_API_URL,
-            headers={
-                "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "prompt": prompt,
-                "n": 1,
-                "size": "1024x1024",
-                "quality": "hd"
-            },
-            timeout=60
-        )
+    await rate_limiter.acquire("openai", os.getenv("OPENAI_API_KEY"))
+    async with llm_telemetry.track("image", "openai", "dall-e-3") as call:
+        async with httpx.AsyncClient(event_hooks={"request": [llm_telemetry.count_attempt]}) as client:
+            response = await client.post(
+                OPENAI_API_URL,
+                headers={
+                    "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "prompt": prompt,
+                    "n": 1,
+                    "size": "1024x1024",
+                    "quality": "hd"
+                },
+                timeout=60
+            )
+        if response.status_code == 200:
+            call.units = 1
+        else:
+            call.error = f"HTTP {response.status_code}"
 
     if response.status_code != 200:
         raise HTTPException(status_code=response.status_code, detail="Failed to generate image")
@@ -68,7 +70,7 @@ async def generate_image(request: ImageGenerationRequest) -> ImageGenerationResp
     result = response.json()
     image_url = result['data'][0]['url']
 
-    # Save to MongoDB
+    # Save to MongoDB (written behind the request, in batches)
     generation_data = {
         "request": request.dict(),
         "image_url": image_url,
@@ -78,7 +80,7 @@ async def generate_image(request: ImageGenerationRequest) -> ImageGenerationResp
         "timestamp": datetime.now()
     }
 
-    collection.insert_one(generation_data)
+    await write_buffer.enqueue("image_generations", generation_data)
 
     # Return the generated image URL
     return ImageGenerationResponse(image_url=image_url)
@@ -155,7 +157,7 @@ async def generate_image(request: ImageGenerationRequest) -> ImageGenerationResp
 #         "timestamp": datetime.now()
 #     }
 
-#     collection.insert_one(generation_data)
+#     await collection.insert_one(generation_data)
 
 #     # Retornando a URL da imagem gerada
 #     return ImageGenerationResponse(image_url=image_url)
\ No newline at end of file
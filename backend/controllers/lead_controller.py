@@ -1,17 +1,22 @@
 from datetime import datetime
-import os
 from zoneinfo import ZoneInfo
 from bson import ObjectId
+from pymongo import ASCENDING
 from fastapi import HTTPException
 from typing import List
 from models.lead import Lead
-from pymongo import MongoClient
-from openai import OpenAI
+from database.mongo import db
+from config import settings
+from services import openai_client
+from services.fingerprint import compute_fingerprint
+from services import bulk_io
+from services.pagination import paginate
 
-mongodb_client = MongoClient(os.getenv("MONGODB_URI"))
-db = mongodb_client[os.getenv("DATABASE_NAME")]
 leads_collection = db["leads"]
 
+# Inputs that feed the generated suggestions
+SUGGESTION_FIELDS = ("name", "email", "phone", "company", "status", "source", "score", "temperature")
+
 def lead_helper(lead) -> dict:
     return {
         "id": str(lead["_id"]),
@@ -39,8 +44,9 @@ async def create_lead(lead: Lead):
         suggestions = await generate_lead_suggestions(lead)
 
         lead_dict["suggestions"] = suggestions
+        lead_dict["suggestions_fingerprint"] = compute_fingerprint(lead_dict, SUGGESTION_FIELDS)
 
-        result = leads_collection.insert_one(lead_dict)
+        result = await leads_collection.insert_one(lead_dict)
 
         lead_dict["_id"] = result.inserted_id
 
@@ -49,37 +55,59 @@ async def create_lead(lead: Lead):
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
-def get_leads() -> List[Lead]:
-    leads = []
-    for lead in leads_collection.find():
-        leads.append(lead_helper(lead))
-    return leads
+# Returns one page of leads and the cursor of the next page
+async def get_leads(limit: int = None, cursor: str = None):
+    leads, next_cursor = await paginate(leads_collection, limit=limit, cursor=cursor)
+    return [lead_helper(lead) for lead in leads], next_cursor
+
+# Import leads from a CSV or JSONL body, upserting on email. Suggestions
+# aren't generated for imported leads; they are on their next update.
+async def import_leads(chunks, format: str):
+    return await bulk_io.import_rows(chunks, format, Lead, leads_collection)
 
-def get_lead_by_id(lead_id: str) -> Lead:
-    lead = leads_collection.find_one({"_id": ObjectId(lead_id)})
+# Yields every lead in page order, one batch in memory at a time
+async def stream_leads():
+    cursor = leads_collection.find().sort("_id", ASCENDING).batch_size(settings.STREAM_BATCH_SIZE)
+    try:
+        async for lead in cursor:
+            yield lead_helper(lead)
+    finally:
+        await cursor.close()
+
+async def get_lead_by_id(lead_id: str) -> Lead:
+    lead = await leads_collection.find_one({"_id": ObjectId(lead_id)})
     if not lead:
         raise HTTPException(status_code=404, detail="Lead not found")
     return lead_helper(lead)
 
-async def update_lead(lead_id: str, lead_data: Lead):
+# Suggestions are only regenerated when the fields behind them changed, or
+# when regenerate is set
+async def update_lead(lead_id: str, lead_data: Lead, regenerate: bool = False):
     try:
         if not ObjectId.is_valid(lead_id):
             raise HTTPException(status_code=400, detail="Invalid lead ID format")
 
-        lead_dict = lead_data.dict(exclude_unset=True, by_alias=True)
+        existing_lead = await leads_collection.find_one({"_id": ObjectId(lead_id)})
+        if not existing_lead:
+            raise HTTPException(status_code=404, detail="Lead not found")
 
-        suggestions = await generate_lead_suggestions(lead_data)
+        lead_dict = lead_data.dict(exclude_unset=True, by_alias=True)
 
-        lead_dict["suggestions"] = suggestions
+        merged_lead = {**lead_helper(existing_lead), **lead_dict}
+        fingerprint = compute_fingerprint(merged_lead, SUGGESTION_FIELDS)
+        if regenerate or existing_lead.get("suggestions_fingerprint") != fingerprint:
+            lead_dict["suggestions"] = await generate_lead_suggestions(Lead(**merged_lead), use_cache=not regenerate)
+            lead_dict["suggestions_fingerprint"] = fingerprint
 
         # Atualiza o lead no MongoDB
-        update_result = leads_collection.update_one(
+        update_result = await leads_collection.update_one(
             {"_id": ObjectId(lead_id)},
             {"$set": lead_dict}
         )
 
-        if update_result.modified_count == 1:
-            updated_lead = leads_collection.find_one({"_id": ObjectId(lead_id)})
+        # matched rather than modified: cached suggestions can leave the document unchanged
+        if update_result.matched_count == 1:
+            updated_lead = await leads_collection.find_one({"_id": ObjectId(lead_id)})
 
             if updated_lead:
                 updated_lead["_id"] = str(updated_lead["_id"])
@@ -87,19 +115,19 @@ async def update_lead(lead_id: str, lead_data: Lead):
 
         raise HTTPException(status_code=404, detail="Lead not found or no changes made.")
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
-def delete_lead(lead_id: str):
-    result = leads_collection.delete_one({"_id": ObjectId(lead_id)})
+async def delete_lead(lead_id: str):
+    result = await leads_collection.delete_one({"_id": ObjectId(lead_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Lead not found")
 
 
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-async def generate_lead_suggestions(lead: Lead):
+async def generate_lead_suggestions(lead: Lead, use_cache: bool = True):
     prompt = f"""
     A lead named {lead.name} with the following details:
     - Email: {lead.email}
@@ -114,15 +142,15 @@ async def generate_lead_suggestions(lead: Lead):
     """
 
     try:
-        response = openai_client.chat.completions.create(
+        return await openai_client.chat_completion(
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are a marketing and sales expert specialized in lead conversion."},
                 {"role": "user", "content": prompt}
-            ]
+            ],
+            cache_namespace="lead",
+            use_cache=use_cache
         )
 
-        return response.choices[0].message.content
-
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred while generating suggestions: {str(e)}")
\ No newline at end of file
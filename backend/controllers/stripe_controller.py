@@ -6,17 +6,12 @@ from controllers.auth_controller import get_user_by_email
 from models.auth_model import User
 from models.stripe_model import CheckoutSession
 from sqlalchemy.ext.asyncio import AsyncSession
-from passlib.context import CryptContext
+from services import rate_limiter, users
+from services.passwords import hash_password
 
 # Configuração do Stripe
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 
-# Criptografia de senha
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
 class StripeController:
 
     @staticmethod
@@ -25,6 +20,7 @@ class StripeController:
         Cria uma sessão de checkout do Stripe e armazena email e senha nos metadados.
         """
         try:
+            await rate_limiter.acquire("stripe", stripe.api_key)
             session = stripe.checkout.Session.create(
                 payment_method_types=['card'],
                 line_items=[{
@@ -38,7 +34,7 @@ class StripeController:
             )
 
 
-            hashed = hash_password(password)
+            hashed = await hash_password(password)
 
             if session:
                await db.execute(text("""
@@ -47,6 +43,7 @@ class StripeController:
               """), {'email': user_email, 'hashed_password': hashed}) 
 
             await db.commit()
+            users.invalidate(user_email)
 
             return session
         except Exception as e:
@@ -88,14 +85,15 @@ class StripeController:
         Ativa a conta do usuário ou cria um novo usuário com a senha fornecida.
         """
         # Verifica se o usuário já existe no banco de dados
-        user = await get_user_by_email(user_email, db)
+        user = await get_user_by_email(user_email, db, use_cache=False)
         
         if not user:
             # Se o usuário não existir, cria um novo com a senha fornecida
-            hashed_password = hash_password(password)
+            hashed_password = await hash_password(password)
             new_user = User(email=user_email, hashed_password=hashed_password)  
             db.add(new_user)
             await db.commit()
+            users.invalidate(user_email)
             await db.refresh(new_user)
 
         return user
@@ -0,0 +1,138 @@
+# app/database/indexes.py
+import logging
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from config import settings
+from database.mongo import db
+
+logger = logging.getLogger(__name__)
+
+# Secondary indexes per collection, applied on startup. Creating an index that
+# already exists with the same spec is a no-op, so this is safe to re-run;
+# give every index an explicit name so changes show up as conflicts in the log.
+INDEXES = {
+    "contents": [
+        IndexModel([("type", ASCENDING), ("createdAt", DESCENDING)], name="type_createdAt"),
+        IndexModel([("createdAt", DESCENDING)], name="createdAt"),
+    ],
+    "leads": [
+        IndexModel([("email", ASCENDING)], name="email"),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING)], name="status_created_at"),
+    ],
+    "crms": [
+        IndexModel([("email", ASCENDING)], name="email"),
+    ],
+    "campaigns": [
+        IndexModel([("created_at", DESCENDING)], name="created_at"),
+    ],
+    "ebooks": [
+        IndexModel([("created_at", DESCENDING)], name="created_at"),
+    ],
+    "dashboards": [
+        IndexModel([("category", ASCENDING), ("created_at", DESCENDING)], name="category_created_at"),
+    ],
+    "image_generations": [
+        IndexModel([("timestamp", DESCENDING)], name="timestamp"),
+        IndexModel([("social_media", ASCENDING), ("post_type", ASCENDING), ("timestamp", DESCENDING)],
+                   name="social_media_post_type_timestamp"),
+    ],
+    "conversations": [
+        IndexModel([("created_at", DESCENDING)], name="created_at"),
+    ],
+    "campaign_metrics": [
+        IndexModel([("timestamp", ASCENDING)], name="timestamp_ttl",
+                   expireAfterSeconds=settings.CAMPAIGN_METRICS_EVENTS_TTL_DAYS * 86400),
+    ],
+    "campaign_metrics_hourly": [
+        IndexModel([("campaign_id", ASCENDING), ("hour", ASCENDING)], name="campaign_id_hour", unique=True),
+        IndexModel([("hour", ASCENDING)], name="hour"),
+    ],
+    "campaign_metrics_daily": [
+        IndexModel([("campaign_id", ASCENDING), ("day", ASCENDING)], name="campaign_id_day", unique=True),
+        IndexModel([("day", ASCENDING)], name="day"),
+    ],
+    "llm_usage_hourly": [
+        IndexModel([("hour", DESCENDING), ("origin", ASCENDING)], name="hour_origin"),
+    ],
+}
+
+
+async def apply_indexes():
+    for collection, indexes in INDEXES.items():
+        try:
+            await db[collection].create_indexes(indexes)
+        except OperationFailure as e:
+            # e.g. an index with the same name but a different spec: leave it
+            # for a manual migration rather than dropping it on startup
+            logger.warning(f"Could not apply indexes on {collection}: {str(e)}")
+
+
+# Turn on the database profiler for operations slower than MONGO_SLOW_QUERY_MS
+# and for collection scans of any duration. Level 1 alone only records slow
+# operations, so fast unindexed scans would never reach slow_query_report;
+# the profile filter (MongoDB 4.4.2+) records both.
+async def configure_profiler():
+    if not settings.MONGO_PROFILER_ENABLED:
+        return
+    profile_filter = {"$or": [
+        {"millis": {"$gte": settings.MONGO_SLOW_QUERY_MS}},
+        {"planSummary": {"$regex": "^COLLSCAN"}},
+    ]}
+    try:
+        await db.command("profile", 1, slowms=settings.MONGO_SLOW_QUERY_MS, filter=profile_filter)
+        return
+    except OperationFailure as e:
+        logger.warning(f"Could not set the Mongo profiler filter, only slow operations will be recorded: {str(e)}")
+    try:
+        await db.command("profile", 1, slowms=settings.MONGO_SLOW_QUERY_MS)
+    except OperationFailure as e:
+        # Not permitted on some managed tiers
+        logger.warning(f"Could not enable the Mongo profiler: {str(e)}")
+
+
+# Slow or collection-scanning operations recorded by the profiler, grouped by
+# collection, operation, plan and filter shape (the filter's field names).
+# Fast collection scans only show up when the profiler filter could be set
+# (see configure_profiler).
+async def slow_query_report(limit: int = 50) -> list:
+    pipeline = [
+        {"$match": {
+            "ns": {"$not": {"$regex": r"\.system\."}},
+            "$or": [
+                {"planSummary": {"$regex": "^COLLSCAN"}},
+                {"millis": {"$gte": settings.MONGO_SLOW_QUERY_MS}},
+            ],
+        }},
+        {"$group": {
+            "_id": {
+                "ns": "$ns",
+                "op": "$op",
+                "plan": "$planSummary",
+                "shape": {"$map": {
+                    "input": {"$objectToArray": {"$ifNull": ["$command.filter", {}]}},
+                    "in": "$$this.k",
+                }},
+                "sort": "$command.sort",
+            },
+            "count": {"$sum": 1},
+            "avg_millis": {"$avg": "$millis"},
+            "max_millis": {"$max": "$millis"},
+            "docs_examined": {"$max": "$docsExamined"},
+            "last_seen": {"$max": "$ts"},
+        }},
+        {"$sort": {"count": -1, "max_millis": -1}},
+        {"$limit": limit},
+    ]
+
+    report = []
+    async for row in db["system.profile"].aggregate(pipeline):
+        group = row.pop("_id")
+        report.append({
+            **group,
+            **row,
+            "avg_millis": round(row["avg_millis"] or 0, 1),
+            "unindexed": str(group.get("plan") or "").startswith("COLLSCAN"),
+        })
+    return report
@@ -1,6 +1,22 @@
 # app/database/mongo.py
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from config import settings
 
-client = MongoClient(settings.MONGODB_URI)
+# One client (and connection pool) per process, shared by every controller.
+# Motor resolves the running event loop per operation, so Celery tasks running
+# their own loops can use it as well.
+client = AsyncIOMotorClient(
+    settings.MONGODB_URI,
+    maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+    minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+    waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+    socketTimeoutMS=settings.MONGO_SOCKET_TIMEOUT_MS,
+)
 db = client[settings.DATABASE_NAME]
+
+
+def close_mongo():
+    client.close()
@@ -0,0 +1,51 @@
+# app/database/redis_client.py
+import asyncio
+import weakref
+
+import redis
+import redis.asyncio as aioredis
+from config import settings
+
+# Redis connections are bound to the event loop that opened them, so keep one
+# client per loop (the uvicorn worker loop, or a Celery task's private loop).
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]" = weakref.WeakKeyDictionary()
+
+
+def get_redis() -> aioredis.Redis:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = aioredis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            health_check_interval=30,
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_redis():
+    loop = asyncio.get_running_loop()
+    client = _clients.pop(loop, None)
+    if client is not None:
+        await client.close()
+
+
+# Blocking client for synchronous code paths (Celery task bodies, sync helpers).
+# redis-py's connection pool is thread safe, so one client per process is enough.
+_sync_client = None
+
+
+def get_sync_redis() -> redis.Redis:
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            health_check_interval=30,
+        )
+    return _sync_client
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import logging
+from config import settings
+from services import openai_client
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "You are an expert in ebook content creation."
+
+# Ask for a structured outline: one {"title", "summary"} object per chapter
+async def generate_outline(title: str, theme: str, category: str, use_cache: bool = True):
+    prompt = f"""
+    Create the outline for an ebook titled '{title}' on the theme '{theme}', in the '{category}' category.
+    The ebook should have {settings.EBOOK_OUTLINE_CHAPTERS} chapters that build on each other.
+
+    Format the response as a JSON array of objects with 'title' and 'summary' fields, where the summary
+    describes in two or three sentences what the chapter must cover.
+    """
+
+    response = await openai_client.chat_completion(
+        model="gpt-4",
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        cache_namespace="ebook",
+        use_cache=use_cache,
+        validate=parse_outline
+    )
+    return parse_outline(response)
+
+# Extract the chapters from the outline completion. Raises ValueError when
+# there are none, so a malformed outline is never cached.
+def parse_outline(response: str):
+    json_start = response.find('[')
+    json_end = response.rfind(']') + 1
+    if json_start == -1 or json_end == 0:
+        raise ValueError("No valid JSON outline found in the response")
+
+    outline = json.loads(response[json_start:json_end])
+    if not outline or not isinstance(outline, list):
+        raise ValueError("Invalid outline format")
+
+    chapters = [
+        {"title": str(chapter.get("title", f"Chapter {index + 1}")), "summary": str(chapter.get("summary", ""))}
+        for index, chapter in enumerate(outline)
+        if isinstance(chapter, dict)
+    ]
+    if not chapters:
+        raise ValueError("The outline has no valid chapters")
+
+    return chapters
+
+# Write a single chapter, giving the model the whole outline for continuity
+async def generate_chapter(title: str, theme: str, category: str, outline, index: int):
+    chapter = outline[index]
+    table_of_contents = "\n".join(
+        f"{position + 1}. {item['title']}" for position, item in enumerate(outline)
+    )
+    prompt = f"""
+    You are writing the ebook '{title}' on the theme '{theme}', in the '{category}' category.
+
+    Table of contents:
+    {table_of_contents}
+
+    Write the full text of chapter {index + 1}, '{chapter['title']}'.
+    It must cover: {chapter['summary']}
+    Do not repeat material that belongs to other chapters and do not include the chapter heading.
+    """
+
+    return await asyncio.wait_for(
+        openai_client.chat_completion(
+            model="gpt-4",
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            cache_namespace="ebook"
+        ),
+        timeout=settings.EBOOK_CHAPTER_TIMEOUT
+    )
+
+# Write the given chapters concurrently with bounded parallelism. Returns
+# {index: (content, error)} so each chapter succeeds or fails on its own.
+async def generate_chapters(title: str, theme: str, category: str, outline, indices, on_chapter_done=None):
+    semaphore = asyncio.Semaphore(settings.EBOOK_CHAPTER_CONCURRENCY)
+
+    async def write(index):
+        async with semaphore:
+            try:
+                content = await generate_chapter(title, theme, category, outline, index)
+                result = (content, None)
+            except Exception as e:
+                logger.error(f"Error generating chapter {index + 1} of '{title}': {e!r}")
+                result = (None, str(e) or e.__class__.__name__)
+        if on_chapter_done is not None:
+            await on_chapter_done(index, *result)
+        return index, result
+
+    results = await asyncio.gather(*[write(index) for index in indices])
+    return dict(results)
+
+# Join the finished chapters in outline order
+def assemble_ebook(chapters) -> str:
+    return "\n\n".join(
+        f"## {chapter['title']}\n\n{chapter['content']}"
+        for chapter in sorted(chapters, key=lambda chapter: chapter["index"])
+        if chapter.get("status") == "done"
+    )
@@ -1,8 +1,15 @@
 # app/main.py
 from routes import business_analysis_routes
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database.db import init_db
+from database.db import close_db, init_db
+from database.indexes import apply_indexes, configure_profiler
+from database.mongo import close_mongo
+from database.redis_client import close_redis
+from services import doc_cache, google_tokens, openai_client, write_buffer
+from services.auth_tokens import get_optional_user
+from services.llm_telemetry import TelemetryContextMiddleware
+from services.loaders import RequestCacheMiddleware
 from routes import (
     brand_voice_routes,
     admin_painel_route,
@@ -14,7 +21,8 @@ from routes import (
     lead_routes,
     voice_to_voice_routes,
     crm_routes,
-    notion_routes)
+    notion_routes,
+    metrics_routes)
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from fastapi.templating import Jinja2Templates
@@ -23,7 +31,9 @@ from routes.login_routes import router as login_router
 from routes.auth_google_route import router as google_auth
 from routes.stripe_route import router as stripe_router
 
-app = FastAPI()
+# Every route reads the bearer token when there is one (request.state.user);
+# routes that require it depend on services.auth_tokens.get_current_user
+app = FastAPI(dependencies=[Depends(get_optional_user)])
 
 # Templates
 templates = Jinja2Templates(directory="templates")
@@ -35,8 +45,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets browser clients read the cursor of the next page of list endpoints
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Attributes LLM calls to the route that made them
+app.add_middleware(TelemetryContextMiddleware)
+
+# Per-request cache of documents resolved by id (services/loaders.py)
+app.add_middleware(RequestCacheMiddleware)
+
 # Inclua os roteadores
 app.include_router(business_analysis_routes.router)
 app.include_router(content_routes.router)
@@ -54,6 +72,7 @@ app.include_router(stripe_router)
 app.include_router(brand_voice_routes.router)
 app.include_router(crm_routes.router)
 app.include_router(notion_routes.router)
+app.include_router(metrics_routes.router)
 
 # Inicializando o banco de dados
 @app.on_event("startup")
@@ -64,6 +83,32 @@ async def on_startup():
     except Exception as e:
         print(f"Error connecting to the database: {e}")
 
+    try:
+        await apply_indexes()
+        await configure_profiler()
+    except Exception as e:
+        print(f"Error applying Mongo indexes: {e}")
+
+    # Invalidates the document cache on writes made outside this process
+    doc_cache.start_watcher()
+
+    # Batches inserts of append-only records (conversations, image generations)
+    write_buffer.start()
+
+    # Google sign-in certificates, fetched ahead of the first sign-in
+    google_tokens.start_refresher()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await doc_cache.stop_watcher()
+    await google_tokens.stop_refresher()
+    # Before the Mongo client closes: writes out what's still buffered
+    await write_buffer.stop()
+    await openai_client.close_clients()
+    await close_redis()
+    await close_db()
+    close_mongo()
+
 # Montar diretório de arquivos estáticos
 audio_dir = Path(__file__).parent / "audio_files"
 audio_dir.mkdir(parents=True, exist_ok=True)
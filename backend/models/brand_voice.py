@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel
 
 class BrandVoiceAnalysisInput(BaseModel):
@@ -7,7 +8,7 @@ class BrandVoiceAnalysisInput(BaseModel):
 
 class CompetitorBasicInfo(BaseModel):
     id: str
-    name: str
-    website: str
-    social_media: str
-    brand_voice: str
\ No newline at end of file
+    name: Optional[str] = None
+    website: Optional[str] = None
+    social_media: Optional[str] = None
+    brand_voice: Optional[str] = None
\ No newline at end of file
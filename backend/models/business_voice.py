@@ -10,8 +10,8 @@ class BusinessAnalysisInput(BaseModel):
 
 class BusinessBasicInfo(BaseModel):
     id: str
-    name: str
-    website: str
+    name: Optional[str] = None
+    website: Optional[str] = None
     social_media: Optional[str] = None
     product: Optional[str] = None
     location: Optional[str] = None
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 from datetime import datetime
 
 class Campaign(BaseModel):
@@ -12,4 +12,12 @@ class Campaign(BaseModel):
     created_at: Optional[datetime] = None
 
     class Config:
-        populate_by_name = True
\ No newline at end of file
+        populate_by_name = True
+
+class CampaignEvent(BaseModel):
+    type: Literal["impression", "click", "conversion"]
+    count: int = Field(1, ge=1)
+    timestamp: Optional[datetime] = None
+
+class CampaignEvents(BaseModel):
+    events: List[CampaignEvent]
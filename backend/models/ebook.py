@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Literal, Optional
 from pydantic import BaseModel
 
 class Ebook(BaseModel):
@@ -7,3 +7,5 @@ class Ebook(BaseModel):
     theme: str
     category: str
     content: str
+    # "single" (one completion) or "chapters" (outline, then chapters in parallel)
+    mode: Literal["single", "chapters"] = "single"
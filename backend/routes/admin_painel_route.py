@@ -1,8 +1,10 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Response
+from typing import List, Optional
 from bson import ObjectId 
 from controllers import admin_painel_controller
+from config import settings
 from models.admin_painel import DashboardCreate, DashboardResponse
+from services.pagination import set_next_cursor
 
 router = APIRouter()
 
@@ -14,11 +16,23 @@ async def create_dashboard(dashboard: DashboardCreate):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Pages of 10 dashboards by default. skip was replaced by the cursor of the
+# next page (X-Next-Cursor) and is rejected rather than silently ignored.
 @router.get("/dashboards/", response_model=List[DashboardResponse])
-async def read_dashboards(skip: int = 0, limit: int = 10):
+async def read_dashboards(
+    response: Response,
+    limit: int = Query(10, ge=1, le=settings.PAGINATION_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="next_cursor returned by the previous page"),
+    skip: Optional[int] = Query(None, include_in_schema=False),
+):
     try:
-        dashboards = await  admin_painel_controller.get_dashboards(skip=skip, limit=limit)
+        if skip is not None:
+            raise HTTPException(status_code=400, detail="skip is no longer supported: pass the X-Next-Cursor of the previous page as cursor")
+        dashboards, next_cursor = await admin_painel_controller.get_dashboards(limit=limit, cursor=cursor)
+        set_next_cursor(response, next_cursor)
         return dashboards
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
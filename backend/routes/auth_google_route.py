@@ -1,10 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends
-from google.oauth2 import id_token
-from google.auth.transport import requests
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from database.db import get_db
 from controllers.login_controller import create_access_token
+from services import google_tokens, users
 import os
 import stripe
 
@@ -16,12 +15,11 @@ GOOGLE_CLIENT_ID = "836199087703-jktkff373784579rbd48hdacpic8ocq5.apps.googleuse
 @router.post("/auth/google")
 async def google_login(token: str, db: AsyncSession = Depends(get_db)):
     try:
-        id_info = id_token.verify_oauth2_token(token, requests.Request(), GOOGLE_CLIENT_ID)
+        id_info = await google_tokens.verify_oauth2_token(token, GOOGLE_CLIENT_ID)
         
         email = id_info.get('email')
 
-        result = await db.execute(text("SELECT * FROM users WHERE email = :email"), {'email': email})
-        user = result.fetchone()
+        user = await users.get_by_email(email, db)
 
         if not user:
             raise HTTPException(status_code=400, detail="User not found")
@@ -44,15 +42,14 @@ async def google_register(
     """
     try:
         # Verificar o token do Google OAuth
-        id_info = id_token.verify_oauth2_token(token, requests.Request(), GOOGLE_CLIENT_ID)
+        id_info = await google_tokens.verify_oauth2_token(token, GOOGLE_CLIENT_ID)
         email = id_info.get('email')
 
         if not email:
             raise HTTPException(status_code=400, detail="Email não encontrado no token")
 
         # Verificar se o usuário já existe
-        result = await db.execute(text("SELECT * FROM users WHERE email = :email"), {'email': email})
-        user = result.fetchone()
+        user = await users.get_by_email(email, db, use_cache=False)
 
         if user:
             raise HTTPException(status_code=400, detail="Email já registrado")
@@ -82,6 +79,7 @@ async def google_register(
                 VALUES (:email)
             """), {'email': email})
             await db.commit()
+            users.invalidate(email)
 
             # Retornar a URL da sessão de checkout
             return {"checkout_session_url": checkout_session.url}
@@ -92,6 +90,7 @@ async def google_register(
                 VALUES (:email)
             """), {'email': email})
             await db.commit()
+            users.invalidate(email)
 
             return {"message": "Usuário registrado com sucesso sem plano."}
 
@@ -1,28 +1,44 @@
 # app/routes/brand_voice_routes.py
-from fastapi import APIRouter, HTTPException, Request
-from typing import List
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Optional
 from models.brand_voice import BrandVoiceAnalysisInput, CompetitorBasicInfo
 from controllers.brand_voice_controller import (
+    COMPETITOR_FIELDS,
+    COMPETITOR_SUMMARY_FIELDS,
     get_all_competitors,
     analyze_and_save_brand_voices,
     get_brand_voice_by_id,
+    get_competitor_fields_by_id,
     delete_competitor,
 )
 from fastapi.templating import Jinja2Templates
+from config import settings
+from services.fieldsets import parse_fields
+from services.pagination import PageParams, set_next_cursor
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 
 @router.get("/")
 async def home(request: Request):
-    competitors = await get_all_competitors()
+    competitors, _ = await get_all_competitors(limit=settings.PAGINATION_DEFAULT_LIMIT)
     return templates.TemplateResponse("index.html", {"request": request, "competitors": competitors})
 
-@router.get("/competitors", response_model=List[CompetitorBasicInfo])
-async def get_competitors_route():
+# Only the summary fields are listed unless others are requested with fields=
+@router.get("/competitors", response_model=List[CompetitorBasicInfo], response_model_exclude_unset=True)
+async def get_competitors_route(
+    response: Response,
+    page: PageParams = Depends(),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
     try:
-        competitors = await get_all_competitors()
+        selected = parse_fields(fields, COMPETITOR_FIELDS, COMPETITOR_SUMMARY_FIELDS)
+        competitors, next_cursor = await get_all_competitors(page.limit, page.cursor, selected)
+        set_next_cursor(response, next_cursor)
         return competitors
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -37,15 +53,33 @@ async def brand_voice_analysis_endpoint(inputs: List[BrandVoiceAnalysisInput]):
 @router.get("/brand_voice/{competitor_id}")
 async def get_brand_voice_endpoint(request: Request, competitor_id: str):
     try:
-        brand_voice = await get_brand_voice_by_id(competitor_id)
+        # The sidebar lists the summary fields of the first page only
+        brand_voice, (competitors, _) = await asyncio.gather(
+            get_brand_voice_by_id(competitor_id),
+            get_all_competitors(limit=settings.PAGINATION_DEFAULT_LIMIT)
+        )
         if brand_voice:
-            competitors = await get_all_competitors()
             return templates.TemplateResponse("index.html", {"request": request, "competitors": competitors, "brand_voice": brand_voice})
         else:
             raise HTTPException(status_code=404, detail="Brand voice not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/competitors/{competitor_id}", response_model=CompetitorBasicInfo, response_model_exclude_unset=True)
+async def get_competitor_route(
+    competitor_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
+    try:
+        competitor = await get_competitor_fields_by_id(competitor_id, parse_fields(fields, COMPETITOR_FIELDS, COMPETITOR_FIELDS))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+    if competitor is None:
+        raise HTTPException(status_code=404, detail=f"Competitor with ID {competitor_id} not found.")
+    return competitor
+
 @router.delete("/competitors/{competitor_id}")
 async def delete_competitor_route(competitor_id: str):
     try:
@@ -1,29 +1,53 @@
 # app/routes/brand_voice_routes.py
+import asyncio
 import traceback
-from fastapi import APIRouter, HTTPException, Request
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Optional
 from models.business_voice import BusinessAnalysisInput, BusinessBasicInfo
 from controllers.business_controller import (
+    BUSINESS_FIELDS,
+    BUSINESS_SUMMARY_FIELDS,
     get_all_business,
+    get_business_fields_by_id,
+    stream_business,
     analyze_and_save_business,
     get_business_analysis_by_id,
     delete_business_analysis,
 )
 from fastapi.templating import Jinja2Templates
+from config import settings
+from services.fieldsets import parse_fields
+from services.ndjson import ndjson_stream, wants_ndjson
+from services.pagination import PageParams, set_next_cursor
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 
 @router.get("/")
 async def home(request: Request):
-    competitors = await get_all_business()
+    competitors, _ = await get_all_business(limit=settings.PAGINATION_DEFAULT_LIMIT)
     return templates.TemplateResponse("index.html", {"request": request, "competitors": competitors})
 
-@router.get("/business", response_model=List[BusinessBasicInfo])
-async def get_business_route():
+# Only the summary fields are listed unless others are requested with fields=
+@router.get("/business", response_model=List[BusinessBasicInfo], response_model_exclude_unset=True)
+async def get_business_route(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
+    selected = parse_fields(fields, BUSINESS_FIELDS, BUSINESS_SUMMARY_FIELDS)
+    # Accept: application/x-ndjson streams every analysis instead of one page
+    if wants_ndjson(request):
+        return ndjson_stream(
+            business.model_dump(exclude_unset=True) async for business in stream_business(selected)
+        )
     try:
-        business = await get_all_business()
+        business, next_cursor = await get_all_business(page.limit, page.cursor, selected)
+        set_next_cursor(response, next_cursor)
         return business
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -40,15 +64,33 @@ async def business_analysis_endpoint(inputs: List[BusinessAnalysisInput]):
 @router.get("/business/{competitor_id}")
 async def get_business_endpoint(request: Request, competitor_id: str):
     try:
-        business = await get_business_analysis_by_id(competitor_id)
+        # The sidebar lists the summary fields of the first page only
+        business, (competitors, _) = await asyncio.gather(
+            get_business_analysis_by_id(competitor_id),
+            get_all_business(limit=settings.PAGINATION_DEFAULT_LIMIT)
+        )
         if business:
-            competitors = await get_all_business()
             return templates.TemplateResponse("index.html", {"request": request, "competitors": competitors, "brand_voice": business})
         else:
             raise HTTPException(status_code=404, detail="Brand voice not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/business/{competitor_id}/analysis", response_model=BusinessBasicInfo, response_model_exclude_unset=True)
+async def get_business_analysis_route(
+    competitor_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
+    try:
+        business = await get_business_fields_by_id(competitor_id, parse_fields(fields, BUSINESS_FIELDS, BUSINESS_FIELDS))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+    if business is None:
+        raise HTTPException(status_code=404, detail=f"Competitor with ID {competitor_id} not found.")
+    return business
+
 @router.delete("/business/{competitor_id}")
 async def delete_business_analysis_route(competitor_id: str):
     try:
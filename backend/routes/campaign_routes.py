@@ -1,7 +1,8 @@
 # app/routes/campaign_routes.py
-from fastapi import APIRouter, HTTPException
-from typing import List
-from models.campaign import Campaign
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import List, Optional
+from models.campaign import Campaign, CampaignEvents
 from controllers.campaign_controller import (
     create_campaign,
     get_campaigns,
@@ -9,7 +10,11 @@ from controllers.campaign_controller import (
     update_campaign,
     delete_campaign,
     get_analytics_data,
+    record_campaign_events,
+    stream_campaign,
 )
+from services.pagination import PageParams, set_next_cursor
+from services.sse import event_stream
 
 router = APIRouter()
 
@@ -21,11 +26,18 @@ async def create_campaign_route(campaign: Campaign):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/campaigns/stream")
+async def create_campaign_stream_route(campaign: Campaign):
+    return event_stream(stream_campaign(campaign))
+
 @router.get("/campaigns/", response_model=List[Campaign])
-async def get_campaigns_route():
+async def get_campaigns_route(response: Response, page: PageParams = Depends()):
     try:
-        campaigns = await get_campaigns()
+        campaigns, next_cursor = await get_campaigns(page.limit, page.cursor)
+        set_next_cursor(response, next_cursor)
         return campaigns
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -38,9 +50,9 @@ async def get_campaign_route(id: str):
         raise HTTPException(status_code=404, detail="Campaign not found")
 
 @router.put("/campaigns/{id}", response_model=Campaign)
-async def update_campaign_route(id: str, campaign: Campaign):
+async def update_campaign_route(id: str, campaign: Campaign, regenerate: bool = False):
     try:
-        updated_campaign = await update_campaign(id, campaign)
+        updated_campaign = await update_campaign(id, campaign, regenerate)
         if updated_campaign:
             return updated_campaign
         else:
@@ -56,10 +68,26 @@ async def delete_campaign_route(id: str):
     else:
         raise HTTPException(status_code=404, detail="Campaign not found")
 
+@router.post("/campaigns/{id}/events", response_model=dict)
+async def record_campaign_events_route(id: str, events: CampaignEvents):
+    try:
+        return await record_campaign_events(id, events)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Totals per campaign; start is inclusive, end exclusive
 @router.get("/analytics", response_model=List[dict])
-async def get_analytics_data_route():
+async def get_analytics_data_route(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    campaign_id: Optional[List[str]] = Query(None)
+):
     try:
-        analytics_data = await get_analytics_data()
+        analytics_data = await get_analytics_data(start, end, campaign_id)
         return analytics_data
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
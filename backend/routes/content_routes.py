@@ -1,7 +1,10 @@
 # app/routes/content_routes.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from models.content import ContentCreatorInput, ContentBasicInfo
-from controllers.content_controller import create_content_plan, get_contents
+from controllers.content_controller import create_content_plan, get_contents, stream_content_plan, stream_contents
+from services.ndjson import ndjson_stream, wants_ndjson
+from services.pagination import PageParams, set_next_cursor
+from services.sse import event_stream
 from typing import List
 
 router = APIRouter()
@@ -14,15 +17,25 @@ async def content_creator_endpoint(input: ContentCreatorInput):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/content_creator/stream")
+async def content_creator_stream_endpoint(input: ContentCreatorInput):
+    return event_stream(stream_content_plan(input))
+
 @router.get("/content", response_model=List[ContentBasicInfo])
-async def get_content():
+async def get_content(request: Request, response: Response, page: PageParams = Depends()):
     try:
         content_type = None  # Defina como necessário
         single_content = False  # Defina como necessário
-        contents = await get_contents(content_type, single_content)
+        # Accept: application/x-ndjson streams every content instead of one page
+        if wants_ndjson(request):
+            return ndjson_stream(stream_contents(content_type))
+        contents, next_cursor = await get_contents(content_type, single_content, page.limit, page.cursor)
         if contents:
+            set_next_cursor(response, next_cursor)
             return contents
         else:
             raise HTTPException(status_code=404, detail="Content not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
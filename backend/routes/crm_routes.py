@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Optional
 from bson import ObjectId
+from pymongo import ASCENDING
+from config import settings
 from models.crm_model import CRMModel
 from database.mongo import db
+from services import bulk_io, doc_cache
+from services.loaders import load_one
+from services.pagination import PageParams, paginate, set_next_cursor
 
 router = APIRouter()
 
@@ -10,22 +15,51 @@ router = APIRouter()
 @router.post("/crms", response_model=CRMModel)
 async def create_crm(crm: CRMModel):
     crm_dict = crm.dict(exclude={"id"})  
-    result = db.crms.insert_one(crm_dict)
+    result = await db.crms.insert_one(crm_dict)
+    await doc_cache.invalidate_lists("crms")
     crm.id = str(result.inserted_id)
     return crm
 
 # Search all CRMs
 @router.get("/crms", response_model=List[CRMModel])
-async def get_all_crms():
-    crms = list(db.crms.find())
+async def get_all_crms(response: Response, page: PageParams = Depends()):
+    crms, next_cursor = await doc_cache.cached_list(
+        "crms",
+        {"limit": page.limit, "cursor": page.cursor},
+        lambda: paginate(db.crms, limit=page.limit, cursor=page.cursor)
+    )
     for crm in crms:
         crm['id'] = str(crm['_id'])
+    set_next_cursor(response, next_cursor)
     return crms
 
+# Import CRMs from a CSV body with a header row (text/csv) or one JSON object
+# per line (application/x-ndjson). Rows are upserted on email.
+@router.post("/crms/import")
+async def import_crms(request: Request, format: Optional[str] = Query(None)):
+    summary = await bulk_io.import_rows(request.stream(), bulk_io.resolve_format(request, format), CRMModel, db.crms)
+    await doc_cache.invalidate("crms")
+    return summary
+
+# Yields every CRM in page order, one batch in memory at a time
+async def stream_crms():
+    cursor = db.crms.find().sort("_id", ASCENDING).batch_size(settings.STREAM_BATCH_SIZE)
+    try:
+        async for crm in cursor:
+            yield {"id": str(crm["_id"]), **{field: crm.get(field) for field in CRMModel.model_fields if field != "id"}}
+    finally:
+        await cursor.close()
+
+# Export every CRM as CSV or JSONL (Accept: text/csv, or ?format=)
+@router.get("/crms/export")
+async def export_crms(request: Request, format: Optional[str] = Query(None)):
+    export_format = bulk_io.resolve_format(request, format, header="accept", default="jsonl")
+    return bulk_io.export_stream(stream_crms(), export_format, list(CRMModel.model_fields), "crms")
+
 # Search for a CRM by ID
 @router.get("/crms/{crm_id}", response_model=CRMModel)
 async def get_crm(crm_id: str):
-    crm = db.crms.find_one({"_id": ObjectId(crm_id)})
+    crm = await load_one("crms", crm_id)
     if crm:
         crm['id'] = str(crm['_id'])
         return crm
@@ -34,12 +68,13 @@ async def get_crm(crm_id: str):
 # Update a CRM
 @router.put("/crms/{crm_id}", response_model=CRMModel)
 async def update_crm(crm_id: str, crm: CRMModel):
-    update_result = db.crms.update_one(
+    update_result = await db.crms.update_one(
         {"_id": ObjectId(crm_id)},
         {"$set": crm.dict(exclude_unset=True, exclude={"id"})}
     )
+    await doc_cache.invalidate("crms", crm_id)
     if update_result.modified_count == 1:
-        updated_crm = db.crms.find_one({"_id": ObjectId(crm_id)})
+        updated_crm = await db.crms.find_one({"_id": ObjectId(crm_id)})
         updated_crm['id'] = str(updated_crm['_id'])
         return updated_crm
     raise HTTPException(status_code=404, detail="CRM not found")
@@ -47,7 +82,8 @@ async def update_crm(crm_id: str, crm: CRMModel):
 # Delete a CRM
 @router.delete("/crms/{crm_id}")
 async def delete_crm(crm_id: str):
-    delete_result = db.crms.delete_one({"_id": ObjectId(crm_id)})
+    delete_result = await db.crms.delete_one({"_id": ObjectId(crm_id)})
+    await doc_cache.invalidate("crms", crm_id)
     if delete_result.deleted_count == 1:
         return {"message": f"CRM with ID {crm_id} has been successfully deleted."}
     raise HTTPException(status_code=404, detail="CRM not found")
@@ -1,5 +1,7 @@
-from fastapi import APIRouter
-from controllers.ebook_controller import create_ebook, delete_ebook, get_ebook_by_id, get_ebooks, update_ebook
+from fastapi import APIRouter, Depends, HTTPException, Response
+from controllers.ebook_controller import create_ebook, delete_ebook, get_ebook_by_id, get_ebooks, retry_ebook_chapter, stream_ebook, update_ebook
+from services.pagination import PageParams, set_next_cursor
+from services.sse import event_stream
 from models.ebook import Ebook
 
 router = APIRouter()
@@ -8,17 +10,29 @@ router = APIRouter()
 async def create_new_ebook(ebook: Ebook):
     return await create_ebook(ebook)
 
+@router.post("/ebooks/stream")
+async def create_new_ebook_stream(ebook: Ebook):
+    if ebook.mode == "chapters":
+        raise HTTPException(status_code=400, detail="Chapter mode can't be streamed, use POST /ebooks/")
+    return event_stream(stream_ebook(ebook))
+
 @router.get("/ebooks/")
-async def read_ebooks():
-    return await get_ebooks()
+async def read_ebooks(response: Response, page: PageParams = Depends()):
+    ebooks, next_cursor = await get_ebooks(page.limit, page.cursor)
+    set_next_cursor(response, next_cursor)
+    return ebooks
 
 @router.get("/ebooks/{id}")
 async def read_ebook(id: str):
     return await get_ebook_by_id(id)
 
 @router.put("/ebooks/{id}")
-async def update_existing_ebook(id: str, ebook: Ebook):
-    return await update_ebook(id, ebook)
+async def update_existing_ebook(id: str, ebook: Ebook, regenerate: bool = False):
+    return await update_ebook(id, ebook, regenerate)
+
+@router.post("/ebooks/{id}/chapters/{index}/retry")
+async def retry_existing_ebook_chapter(id: str, index: int):
+    return await retry_ebook_chapter(id, index)
 
 @router.delete("/ebooks/{id}")
 async def delete_existing_ebook(id: str):
@@ -1,7 +1,10 @@
-from typing import List
-from fastapi import APIRouter
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query, Request, Response
 from controllers import lead_controller
 from models.lead import Lead, LeadUpdate
+from services import bulk_io
+from services.ndjson import ndjson_stream, wants_ndjson
+from services.pagination import PageParams, set_next_cursor
 
 router = APIRouter()
 
@@ -10,19 +13,35 @@ async def create_lead(lead: Lead):
     return await lead_controller.create_lead(lead)
 
 @router.get("/leads", response_model=List[Lead])
-def get_leads():
-    return lead_controller.get_leads()
+async def get_leads(request: Request, response: Response, page: PageParams = Depends()):
+    # Accept: application/x-ndjson streams every lead instead of one page
+    if wants_ndjson(request):
+        return ndjson_stream(lead_controller.stream_leads())
+    leads, next_cursor = await lead_controller.get_leads(page.limit, page.cursor)
+    set_next_cursor(response, next_cursor)
+    return leads
+
+# Body: CSV with a header row (text/csv) or one JSON object per line
+# (application/x-ndjson). Rows are upserted on email.
+@router.post("/leads/import")
+async def import_leads(request: Request, format: Optional[str] = Query(None)):
+    return await lead_controller.import_leads(request.stream(), bulk_io.resolve_format(request, format))
+
+@router.get("/leads/export")
+async def export_leads(request: Request, format: Optional[str] = Query(None)):
+    export_format = bulk_io.resolve_format(request, format, header="accept", default="jsonl")
+    return bulk_io.export_stream(lead_controller.stream_leads(), export_format, list(Lead.model_fields), "leads")
 
 @router.get("/leads/{lead_id}", response_model=Lead)
-def get_lead(lead_id: str):
-    return lead_controller.get_lead_by_id(lead_id)
+async def get_lead(lead_id: str):
+    return await lead_controller.get_lead_by_id(lead_id)
 
 @router.put("/leads/{lead_id}", response_model=Lead)
-async def update_lead(lead_id: str, lead_data: LeadUpdate):
-    return await lead_controller.update_lead(lead_id, lead_data)
+async def update_lead(lead_id: str, lead_data: LeadUpdate, regenerate: bool = False):
+    return await lead_controller.update_lead(lead_id, lead_data, regenerate)
 
 @router.delete("/leads/{lead_id}")
-def delete_lead(lead_id: str):
-    lead_controller.delete_lead(lead_id)
+async def delete_lead(lead_id: str):
+    await lead_controller.delete_lead(lead_id)
     return {"message": "Lead deleted successfully"}
 
@@ -1,25 +1,48 @@
 from sqlalchemy import text
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from controllers.login_controller import ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token, verify_password
+from controllers.login_controller import ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token
 from database.db import get_db
 from datetime import timedelta
 from models.login import Login
+from services.auth_tokens import get_current_user
+from services import users
+from services.passwords import verify_password
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 @router.post("/login")
 async def login(user_data: Login, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(text("SELECT * FROM users WHERE email = :email"), {'email': user_data.email})
-    user = result.fetchone()
+    user = await users.get_by_email(user_data.email, db)
 
     if not user:
         raise HTTPException(status_code=400, detail="Invalid email or password")
 
-    if not verify_password(user_data.password, user.hashed_password):
+    valid, new_hash = await verify_password(user_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=400, detail="Invalid email or password")
 
+    # Stored hash made with another work factor: replace it (best effort, the
+    # login succeeds either way)
+    if new_hash:
+        try:
+            await db.execute(text("UPDATE users SET hashed_password = :hashed_password WHERE id = :id"),
+                             {'hashed_password': new_hash, 'id': user.id})
+            await db.commit()
+            users.invalidate(user.email)
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"Could not rehash the password of user {user.id}: {str(e)}")
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(data={"sub": user.email}, expires_delta=access_token_expires)
 
     return {"access_token": access_token, "token_type": "bearer"}
+
+# Verified statelessly from the token (no database or session lookup)
+@router.get("/me")
+async def me(claims: dict = Depends(get_current_user)):
+    return {"email": claims["sub"], "expires_at": claims["exp"]}
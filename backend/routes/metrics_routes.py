@@ -0,0 +1,47 @@
+# app/routes/metrics_routes.py
+from fastapi import APIRouter, Query
+from database.db import pool_stats
+from database.indexes import slow_query_report
+from services import doc_cache, google_tokens, llm_cache, llm_telemetry, rate_limiter, singleflight, users, write_buffer
+
+router = APIRouter()
+
+@router.get("/metrics/llm")
+async def get_llm_metrics(hours: int = Query(24, ge=1, le=24 * 90)):
+    return await llm_telemetry.summary(hours)
+
+@router.get("/metrics/llm-cache")
+async def get_llm_cache_metrics():
+    return llm_cache.stats()
+
+@router.get("/metrics/doc-cache")
+async def get_doc_cache_metrics():
+    return doc_cache.stats()
+
+@router.get("/metrics/write-buffer")
+async def get_write_buffer_metrics():
+    return write_buffer.stats()
+
+@router.get("/metrics/user-cache")
+async def get_user_cache_metrics():
+    return users.stats()
+
+@router.get("/metrics/google-certs")
+async def get_google_certs_metrics():
+    return google_tokens.stats()
+
+@router.get("/metrics/singleflight")
+async def get_singleflight_metrics():
+    return singleflight.stats()
+
+@router.get("/metrics/rate-limits")
+async def get_rate_limit_metrics():
+    return rate_limiter.stats()
+
+@router.get("/metrics/mongo/slow-queries")
+async def get_mongo_slow_queries(limit: int = Query(50, ge=1, le=500)):
+    return await slow_query_report(limit)
+
+@router.get("/metrics/postgres")
+async def get_postgres_metrics():
+    return pool_stats()
@@ -1,7 +1,9 @@
+import functools
 import logging
 import os
 from pathlib import Path
 from typing import List, Optional
+import anyio
 from fastapi.responses import JSONResponse
 import requests
 from apify_client import ApifyClient
@@ -11,6 +13,7 @@ from notion_client import Client
 from pydantic import BaseModel
 from models.notion_model import NotionProject
 from celery_config import celery_app
+from services import rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -106,6 +109,7 @@ async def create_project(project: NotionProject):
     }
 
     # Criar o projeto no Notion
+    await rate_limiter.acquire("notion", NOTION_API_KEY)
     response = requests.post(NOTION_API_URL, headers=headers, json=notion_data)
 
     if response.status_code != 200:
@@ -120,6 +124,7 @@ async def create_project(project: NotionProject):
 # READ ALL (Síncrono com Notion)
 @router.get("/projects/")
 async def get_all_projects():
+    await rate_limiter.acquire("notion", NOTION_API_KEY)
     response = requests.post(NOTION_QUERY_URL, headers=headers, json={})
 
     if response.status_code != 200:
@@ -166,6 +171,7 @@ async def update_project(project_id: str, project: NotionProject):
     }
 
     # Make a PATCH request to update the Notion database entry
+    await rate_limiter.acquire("notion", NOTION_API_KEY)
     response = requests.patch(f"{NOTION_API_URL}/{notion_id}", headers=headers, json=notion_data)
 
     # Check for errors in the response
@@ -185,9 +191,11 @@ tavily_api_key = os.getenv("TAVILY_API_KEY")
 perplexity_key = os.getenv("PERPLEXITY_API_KEY")
 
 
-def get_project_data_from_notion(project_id: str):
+async def get_project_data_from_notion(project_id: str):
     try:
-        page = notion.pages.retrieve(page_id=project_id)
+        await rate_limiter.acquire("notion", NOTION_API_KEY)
+        # The Notion client is synchronous: keep the request off the event loop
+        page = await anyio.to_thread.run_sync(functools.partial(notion.pages.retrieve, page_id=project_id))
         properties = page.get("properties", {})
 
         return {
@@ -214,7 +222,7 @@ async def save_pdf(project_id: str,
         logging.info(f"Iniciando processo para project_id: {project_id}")
 
         # Obtém dados do projeto
-        project_data = get_project_data_from_notion(project_id)
+        project_data = await get_project_data_from_notion(project_id)
         if not project_data:
             raise HTTPException(status_code=404,
                                 detail="Project data not found")
@@ -0,0 +1,81 @@
+# app/services/auth_tokens.py
+import logging
+import secrets
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from cachetools import TTLCache
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Signing keys by key id. Tokens are signed with the active key and carry its
+# id in the `kid` header; every configured key is accepted, so a new key can
+# be made active while tokens signed with the previous one are still valid.
+_keys = dict(settings.JWT_KEYS)
+if not _keys:
+    if not settings.JWT_ALLOW_EPHEMERAL_KEY:
+        raise RuntimeError("JWT_KEYS is not set (set JWT_ALLOW_EPHEMERAL_KEY=true to use a per-process key in development)")
+    # Tokens issued by one process won't verify in another (or after a restart)
+    logger.warning("JWT_KEYS is not set, using a per-process signing key")
+    _keys = {"local": secrets.token_hex(32)}
+_active_kid = settings.JWT_ACTIVE_KEY_ID or next(iter(_keys))
+if _active_kid not in _keys:
+    raise RuntimeError(f"JWT_ACTIVE_KEY_ID {_active_kid} is not one of JWT_KEYS")
+
+# Decoded claims by token. Entries never outlive the token (checked on every
+# hit), and the keys don't change while the process runs.
+_claims = TTLCache(maxsize=settings.JWT_CLAIMS_CACHE_MAXSIZE, ttl=settings.JWT_CLAIMS_CACHE_TTL)
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
+    to_encode = data.copy()
+    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES))
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
+    return jwt.encode(to_encode, _keys[_active_kid], algorithm=settings.JWT_ALGORITHM, headers={"kid": _active_kid})
+
+
+# Claims of a valid token, None for an invalid or expired one
+def decode_access_token(token: str) -> Optional[dict]:
+    claims = _claims.get(token)
+    if claims is not None:
+        if claims["exp"] > time.time():
+            return claims
+        _claims.pop(token, None)
+        return None
+
+    try:
+        kid = jwt.get_unverified_header(token).get("kid", _active_kid)
+        key = _keys.get(kid)
+        if key is None:
+            return None
+        claims = jwt.decode(token, key, algorithms=[settings.JWT_ALGORITHM])
+    except JWTError:
+        return None
+    if "exp" not in claims:
+        return None
+    _claims[token] = claims
+    return claims
+
+
+# Claims of the bearer token, if the request carries a valid one. Also
+# records its subject on request.state.user (LLM telemetry reads it).
+async def get_optional_user(request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> Optional[dict]:
+    claims = decode_access_token(credentials.credentials) if credentials else None
+    request.state.user = claims.get("sub") if claims else None
+    return claims
+
+
+# For routes that require a logged-in user
+async def get_current_user(claims: Optional[dict] = Depends(get_optional_user)) -> dict:
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+    return claims
+
@@ -0,0 +1,131 @@
+# app/services/blob_store.py
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List
+
+import anyio
+import zstandard
+from bson import Binary, json_util
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from config import settings
+from database.mongo import db
+
+BLOBS_COLLECTION = "blobs"
+
+# A value moved to the blob store is replaced by {"_blob": "<sha256>"}
+REF_KEY = "_blob"
+
+
+def is_ref(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and isinstance(value.get(REF_KEY), str)
+
+
+def _serialize(value: Any) -> bytes:
+    return json_util.dumps(value, sort_keys=True).encode("utf-8")
+
+
+def _compress(data: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=settings.BLOB_ZSTD_LEVEL).compress(data)
+
+
+def _decompress(blobs: List[dict]) -> Dict[str, Any]:
+    decompressor = zstandard.ZstdDecompressor()
+    return {blob["_id"]: json_util.loads(decompressor.decompress(blob["data"])) for blob in blobs}
+
+
+# Store `value` by the hash of its content and return a reference to it, or
+# the value itself when it's smaller than BLOB_MIN_BYTES. Storing the same
+# content twice keeps one copy and counts one more reference to it.
+async def put(value: Any) -> Any:
+    if value is None or is_ref(value):
+        return value
+    data = _serialize(value)
+    if len(data) < settings.BLOB_MIN_BYTES:
+        return value
+
+    digest = hashlib.sha256(data).hexdigest()
+    blob = await db[BLOBS_COLLECTION].find_one_and_update(
+        {"_id": digest},
+        {"$inc": {"refs": 1}},
+        projection={"_id": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if blob is None:
+        compressed = await anyio.to_thread.run_sync(_compress, data)
+        try:
+            await db[BLOBS_COLLECTION].update_one(
+                {"_id": digest},
+                {
+                    "$setOnInsert": {
+                        "data": Binary(compressed),
+                        "encoding": "zstd",
+                        "size": len(data),
+                        "compressed_size": len(compressed),
+                        "created_at": datetime.now(timezone.utc),
+                    },
+                    "$inc": {"refs": 1},
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # Inserted concurrently by another writer
+            await db[BLOBS_COLLECTION].update_one({"_id": digest}, {"$inc": {"refs": 1}})
+    return {REF_KEY: digest}
+
+
+def _collect_refs(value: Any, refs: list):
+    if is_ref(value):
+        refs.append(value[REF_KEY])
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_refs(item, refs)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_refs(item, refs)
+
+
+def _replace_refs(value: Any, blobs: Dict[str, Any]) -> Any:
+    if is_ref(value):
+        # A missing blob reads as None rather than failing the whole document
+        return blobs.get(value[REF_KEY])
+    if isinstance(value, dict):
+        return {key: _replace_refs(item, blobs) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_replace_refs(item, blobs) for item in value]
+    return value
+
+
+# Replace every reference inside `documents` with the stored value, in place.
+# All the blobs are fetched with a single query.
+async def hydrate(documents: Iterable[dict]) -> None:
+    documents = [document for document in documents if document]
+    refs = []
+    for document in documents:
+        _collect_refs(document, refs)
+    if not refs:
+        return
+
+    stored = await db[BLOBS_COLLECTION].find({"_id": {"$in": list(set(refs))}}, {"data": 1}).to_list(length=None)
+    blobs = await anyio.to_thread.run_sync(_decompress, stored)
+    for document in documents:
+        for key, value in document.items():
+            document[key] = _replace_refs(value, blobs)
+
+
+# Drop one reference to every blob referenced inside `documents`; blobs
+# nothing refers to any more are deleted
+async def release(documents: Iterable[dict]) -> None:
+    refs = []
+    for document in documents:
+        _collect_refs(document, refs)
+    for digest in refs:
+        blob = await db[BLOBS_COLLECTION].find_one_and_update(
+            {"_id": digest},
+            {"$inc": {"refs": -1}},
+            projection={"refs": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if blob is not None and blob["refs"] <= 0:
+            await db[BLOBS_COLLECTION].delete_one({"_id": digest, "refs": {"$lte": 0}})
@@ -0,0 +1,187 @@
+# app/services/bulk_io.py
+import codecs
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from config import settings
+from services.ndjson import NDJSON_MEDIA_TYPE, ndjson_stream
+
+CSV_MEDIA_TYPE = "text/csv"
+FORMATS = ("csv", "jsonl")
+
+
+# Import/export format from the `format` query parameter, else from the media
+# type in `header` (Content-Type of an import, Accept of an export)
+def resolve_format(request: Request, format: Optional[str], header: str = "content-type", default: Optional[str] = None) -> str:
+    if format:
+        if format not in FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported format: {format}. Use one of: {', '.join(FORMATS)}")
+        return format
+    media_type = request.headers.get(header, "")
+    if CSV_MEDIA_TYPE in media_type:
+        return "csv"
+    if NDJSON_MEDIA_TYPE in media_type or "jsonl" in media_type:
+        return "jsonl"
+    if default:
+        return default
+    raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson, or pass ?format=csv|jsonl")
+
+
+# Decode a byte stream into lines (newlines kept) without holding more than
+# one chunk and one partial line in memory
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+# CSV records as (line number, {column: value}); the first record is the
+# header. A quoted field may span lines: a record is complete once its
+# quotes are balanced.
+async def _csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    header = None
+    record, start, line_number = "", 0, 0
+    async for line in _lines(chunks):
+        line_number += 1
+        if not record:
+            start = line_number
+        record += line
+        if record.count('"') % 2:
+            continue
+
+        values = next(csv.reader([record]), [])
+        record = ""
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [value.strip() for value in values]
+            continue
+        yield start, {column: (value.strip() or None) for column, value in zip(header, values)}
+
+    if record:
+        yield start, ValueError("Unterminated quoted field")
+
+
+async def _jsonl_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    line_number = 0
+    async for line in _lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, e
+            continue
+        yield line_number, row if isinstance(row, dict) else ValueError("Each line must be a JSON object")
+
+
+def _error_detail(error: Exception) -> Any:
+    if isinstance(error, ValidationError):
+        return [{"field": ".".join(str(part) for part in item["loc"]), "message": item["msg"]} for item in error.errors()]
+    return str(error)
+
+
+# Import the rows of a CSV or JSONL body into `collection`, upserting on
+# `key` (normalized to lower case). Rows are validated against `model` and
+# written BULK_IMPORT_CHUNK_SIZE at a time with unordered bulk writes, so a
+# bad row never stops the import; each one is reported with its line number.
+# Empty values don't overwrite what an existing record already has.
+async def import_rows(chunks: AsyncIterator[bytes], format: str, model: Type[BaseModel], collection, key: str = "email") -> dict:
+    summary = {"processed": 0, "inserted": 0, "updated": 0, "unchanged": 0, "failed": 0, "errors": []}
+
+    def fail(line_number: int, error: Any):
+        summary["failed"] += 1
+        if len(summary["errors"]) < settings.BULK_IMPORT_MAX_ERRORS:
+            summary["errors"].append({"line": line_number, "error": error})
+
+    async def flush(batch: List[Tuple[int, Dict[str, Any]]]):
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne(
+                {key: fields[key]},
+                {
+                    "$set": {field: value for field, value in fields.items() if value is not None},
+                    "$setOnInsert": {
+                        **{field: None for field, value in fields.items() if value is None},
+                        "created_at": now,
+                    },
+                },
+                upsert=True
+            )
+            for _, fields in batch
+        ]
+        try:
+            result = (await collection.bulk_write(operations, ordered=False)).bulk_api_result
+        except BulkWriteError as e:
+            result = e.details
+            for write_error in result.get("writeErrors", []):
+                fail(batch[write_error["index"]][0], write_error.get("errmsg", "Write failed"))
+        summary["inserted"] += result.get("nUpserted", 0)
+        summary["updated"] += result.get("nModified", 0)
+        summary["unchanged"] += result.get("nMatched", 0) - result.get("nModified", 0)
+
+    rows = _csv_rows(chunks) if format == "csv" else _jsonl_rows(chunks)
+    batch = []
+    async for line_number, row in rows:
+        summary["processed"] += 1
+        if isinstance(row, Exception):
+            fail(line_number, _error_detail(row))
+            continue
+        try:
+            # Unknown columns are ignored, missing ones read as empty
+            record = model(**{field: row.get(field) for field in model.model_fields if field != "id"})
+        except ValidationError as e:
+            fail(line_number, _error_detail(e))
+            continue
+
+        fields = record.dict(exclude={"id"})
+        fields[key] = str(fields[key]).strip().lower()
+        batch.append((line_number, fields))
+        if len(batch) >= settings.BULK_IMPORT_CHUNK_SIZE:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+    return summary
+
+
+# `documents` (already shaped for output) as CSV lines with the given columns
+async def _csv_lines(documents: AsyncIterator[dict], columns: List[str]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    async for document in documents:
+        buffer.seek(0)
+        buffer.truncate()
+        encoded = jsonable_encoder(document)
+        writer.writerow(["" if encoded.get(column) is None else encoded.get(column) for column in columns])
+        yield buffer.getvalue()
+
+
+# Stream documents as a CSV or JSONL download
+def export_stream(documents: AsyncIterator[dict], format: str, columns: List[str], filename: str) -> StreamingResponse:
+    if format == "jsonl":
+        response = ndjson_stream(documents)
+    else:
+        response = StreamingResponse(_csv_lines(documents, columns), media_type=CSV_MEDIA_TYPE)
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}.{format}"'
+    return response
@@ -0,0 +1,129 @@
+# app/services/campaign_metrics.py
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from database.mongo import db
+
+EVENTS_COLLECTION = "campaign_metrics"
+HOURLY_COLLECTION = "campaign_metrics_hourly"
+DAILY_COLLECTION = "campaign_metrics_daily"
+
+# Event type -> counter it increments in the rollups
+COUNTERS = {
+    "impression": "impressions",
+    "click": "clicks",
+    "conversion": "conversions",
+}
+
+
+def _utc(value: Optional[datetime]) -> datetime:
+    if value is None:
+        return datetime.now(timezone.utc)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _hour(timestamp: datetime) -> datetime:
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def _day(timestamp: datetime) -> datetime:
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+# Store raw events ({"campaign_id", "type", "count", "timestamp"}) and add
+# them to the hourly and daily rollups. Events are summed per bucket first,
+# so a batch costs one upsert per campaign and bucket whatever its size.
+async def record_events(events: Iterable[dict]) -> int:
+    documents = []
+    hourly = defaultdict(lambda: defaultdict(int))
+    daily = defaultdict(lambda: defaultdict(int))
+    for event in events:
+        timestamp = _utc(event.get("timestamp"))
+        campaign_id = ObjectId(event["campaign_id"])
+        counter = COUNTERS[event["type"]]
+        count = event.get("count", 1)
+        documents.append({
+            "campaign_id": campaign_id,
+            "type": event["type"],
+            "count": count,
+            "timestamp": timestamp,
+        })
+        hourly[(campaign_id, _hour(timestamp))][counter] += count
+        daily[(campaign_id, _day(timestamp))][counter] += count
+
+    if not documents:
+        return 0
+
+    await db[EVENTS_COLLECTION].insert_many(documents, ordered=False)
+    for collection, field, rollups in ((HOURLY_COLLECTION, "hour", hourly), (DAILY_COLLECTION, "day", daily)):
+        await db[collection].bulk_write([
+            UpdateOne({"campaign_id": campaign_id, field: bucket}, {"$inc": dict(counters)}, upsert=True)
+            for (campaign_id, bucket), counters in rollups.items()
+        ], ordered=False)
+    return len(documents)
+
+
+async def delete_campaign_metrics(campaign_id: ObjectId):
+    for collection in (EVENTS_COLLECTION, HOURLY_COLLECTION, DAILY_COLLECTION):
+        await db[collection].delete_many({"campaign_id": campaign_id})
+
+
+# Impressions, clicks and conversions per campaign between `start` and `end`
+# (end excluded). Whole days are read from the daily rollups; a range that
+# starts or ends mid-day is read from the hourly ones.
+async def totals(start: Optional[datetime] = None, end: Optional[datetime] = None, campaign_ids: Optional[List[str]] = None) -> List[dict]:
+    start = _utc(start) if start else None
+    end = _utc(end) if end else None
+    if all(bound is None or bound == _day(bound) for bound in (start, end)):
+        collection, field = DAILY_COLLECTION, "day"
+    else:
+        collection, field = HOURLY_COLLECTION, "hour"
+        # Hours are the finest bucket: round the range out to whole hours
+        start = _hour(start) if start else None
+        if end and end != _hour(end):
+            end = _hour(end) + timedelta(hours=1)
+
+    match = {}
+    if start or end:
+        match[field] = {}
+        if start:
+            match[field]["$gte"] = start
+        if end:
+            match[field]["$lt"] = end
+    if campaign_ids:
+        match["campaign_id"] = {"$in": [ObjectId(id) for id in campaign_ids]}
+
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": "$campaign_id",
+            **{counter: {"$sum": f"${counter}"} for counter in COUNTERS.values()},
+        }},
+        # Only the name of each campaign, not its content plan
+        {"$lookup": {
+            "from": "campaigns",
+            "let": {"campaign_id": "$_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$campaign_id"]}}},
+                {"$project": {"name": 1}},
+            ],
+            "as": "campaign",
+        }},
+        {"$sort": {"conversions": -1, "clicks": -1, "impressions": -1}},
+    ]
+
+    results = []
+    async for row in db[collection].aggregate(pipeline):
+        campaign = row["campaign"][0] if row["campaign"] else {}
+        results.append({
+            "campaign_id": str(row["_id"]),
+            "name": campaign.get("name"),
+            **{counter: row[counter] for counter in COUNTERS.values()},
+        })
+    return results
@@ -0,0 +1,268 @@
+# app/services/doc_cache.py
+import asyncio
+import hashlib
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from bson import json_util
+from cachetools import TTLCache
+from pymongo.errors import OperationFailure
+
+from config import settings
+from database.mongo import db
+from database.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "doc_cache:"
+
+# Collections read through this cache. Every write to them must be followed
+# by invalidate(); the change-stream watcher also catches writes made
+# elsewhere (other services, the shell, other workers' L1).
+CACHED_COLLECTIONS = ("brand_voices", "business_analysis", "dashboards", "crms")
+
+# L1: per-process, size bounded with a short TTL, which also bounds how long
+# another process's write can go unnoticed when change streams are
+# unavailable. Values are serialized so callers can't mutate cached entries.
+_l1 = TTLCache(maxsize=settings.DOC_CACHE_L1_MAXSIZE, ttl=settings.DOC_CACHE_L1_TTL)
+
+# Bumped on every invalidation of a collection: a value loaded while the
+# collection changed is not cached
+_epochs: Dict[str, int] = defaultdict(int)
+
+_counters: Dict[str, Dict[str, int]] = defaultdict(
+    lambda: {"l1_hits": 0, "l2_hits": 0, "misses": 0, "invalidations": 0}
+)
+_watcher: Dict[str, Any] = {"task": None, "state": "stopped", "events": 0}
+
+
+def is_enabled(collection: str) -> bool:
+    return settings.DOC_CACHE_ENABLED and collection in CACHED_COLLECTIONS
+
+
+def _id_key(collection: str, id: str) -> str:
+    return f"{KEY_PREFIX}{collection}:id:{id}"
+
+
+def _lists_key(collection: str) -> str:
+    return f"{KEY_PREFIX}{collection}:lists"
+
+
+def _projection_field(projection: Optional[Dict[str, Any]]) -> str:
+    return ",".join(sorted(projection)) if projection else "*"
+
+
+def _params_field(params: Dict[str, Any]) -> str:
+    return hashlib.sha256(json_util.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _hit(collection: str, tier: str):
+    _counters[collection][f"{tier}_hits"] += 1
+
+
+# Cached documents by id, for the ids found in either tier. A cached None
+# means the document doesn't exist.
+async def get_many(collection: str, ids: Iterable[str], projection: Optional[Dict[str, Any]] = None) -> Dict[str, Optional[dict]]:
+    field = _projection_field(projection)
+    found = {}
+    remote = []
+    for id in ids:
+        value = _l1.get((collection, "id", id, field))
+        if value is not None:
+            _hit(collection, "l1")
+            found[id] = json_util.loads(value)
+        else:
+            remote.append(id)
+
+    if remote:
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for id in remote:
+                pipe.hget(_id_key(collection, id), field)
+            values = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Document cache read failed, falling back to Mongo: {str(e)}")
+            values = [None] * len(remote)
+
+        for id, value in zip(remote, values):
+            if value is None:
+                _counters[collection]["misses"] += 1
+                continue
+            _hit(collection, "l2")
+            _l1[(collection, "id", id, field)] = value
+            found[id] = json_util.loads(value)
+    return found
+
+
+# Cache documents loaded by id (None for ids that don't exist). `epoch` is
+# the value of current_epoch() taken before they were loaded.
+async def put_many(collection: str, documents: Dict[str, Optional[dict]], projection: Optional[Dict[str, Any]], epoch: int):
+    if not documents or _epochs[collection] != epoch:
+        return
+    field = _projection_field(projection)
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for id, document in documents.items():
+            value = json_util.dumps(document)
+            _l1[(collection, "id", id, field)] = value
+            pipe.hset(_id_key(collection, id), field, value)
+            pipe.expire(_id_key(collection, id), settings.DOC_CACHE_TTL)
+        await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Document cache write failed: {str(e)}")
+
+
+def current_epoch(collection: str) -> int:
+    return _epochs[collection]
+
+
+# Read-through cache for list queries: `params` identifies the query (page,
+# fields...), `loader` runs it on a miss. The result must be BSON-serializable.
+async def cached_list(collection: str, params: Dict[str, Any], loader: Callable[[], Awaitable[Any]]) -> Any:
+    if not is_enabled(collection):
+        return await loader()
+
+    field = _params_field(params)
+    value = _l1.get((collection, "list", field))
+    if value is not None:
+        _hit(collection, "l1")
+        return json_util.loads(value)
+
+    try:
+        value = await get_redis().hget(_lists_key(collection), field)
+    except Exception as e:
+        logger.warning(f"Document cache read failed, falling back to Mongo: {str(e)}")
+        value = None
+    if value is not None:
+        _hit(collection, "l2")
+        _l1[(collection, "list", field)] = value
+        return json_util.loads(value)
+
+    _counters[collection]["misses"] += 1
+    epoch = _epochs[collection]
+    result = await loader()
+    if _epochs[collection] == epoch:
+        value = json_util.dumps(result)
+        _l1[(collection, "list", field)] = value
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.hset(_lists_key(collection), field, value)
+            pipe.expire(_lists_key(collection), settings.DOC_CACHE_TTL)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Document cache write failed: {str(e)}")
+    # Always hand out a copy, as on a hit
+    return json_util.loads(value) if value is not None else result
+
+
+def _invalidate_local(collection: str, id: Optional[str] = None, lists_only: bool = False):
+    _epochs[collection] += 1
+    _counters[collection]["invalidations"] += 1
+    for key in list(_l1.keys()):
+        if key[0] != collection:
+            continue
+        if key[1] == "list" or (not lists_only and (id is None or key[2] == id)):
+            _l1.pop(key, None)
+
+
+# Drop the cached lists of `collection` and the cached document `id` (every
+# document when id is None) from both tiers
+async def invalidate(collection: str, id: Optional[str] = None):
+    if collection not in CACHED_COLLECTIONS:
+        return
+    _invalidate_local(collection, id)
+    try:
+        redis = get_redis()
+        if id is None:
+            keys = [key async for key in redis.scan_iter(match=f"{KEY_PREFIX}{collection}:*", count=500)]
+            if keys:
+                await redis.delete(*keys)
+        else:
+            await redis.delete(_id_key(collection, id), _lists_key(collection))
+    except Exception as e:
+        logger.warning(f"Document cache invalidation failed for {collection}: {str(e)}")
+
+
+# After inserts: only the cached lists can be out of date
+async def invalidate_lists(collection: str):
+    if collection not in CACHED_COLLECTIONS:
+        return
+    _invalidate_local(collection, lists_only=True)
+    try:
+        await get_redis().delete(_lists_key(collection))
+    except Exception as e:
+        logger.warning(f"Document cache invalidation failed for {collection}: {str(e)}")
+
+
+# Follow writes to the cached collections with a change stream and
+# invalidate the documents they touch. Change streams need a replica set;
+# without one the watcher stops and the write hooks are all there is.
+async def _watch():
+    resume_after = None
+    pipeline = [{"$match": {"ns.coll": {"$in": list(CACHED_COLLECTIONS)}}}]
+    while True:
+        try:
+            async with db.watch(pipeline, resume_after=resume_after) as stream:
+                _watcher["state"] = "active"
+                async for change in stream:
+                    resume_after = stream.resume_token
+                    _watcher["events"] += 1
+                    collection = change.get("ns", {}).get("coll")
+                    document_id = change.get("documentKey", {}).get("_id")
+                    await invalidate(collection, str(document_id) if document_id is not None else None)
+        except asyncio.CancelledError:
+            raise
+        except OperationFailure as e:
+            if e.code == 40573 or "replica set" in str(e):
+                logger.info("Change streams unavailable, document cache relies on write hooks")
+                _watcher["state"] = "unavailable"
+                return
+            logger.warning(f"Document cache change stream failed: {str(e)}")
+            resume_after = None
+        except Exception as e:
+            logger.warning(f"Document cache change stream failed: {str(e)}")
+
+        # Changes may have been missed while the stream was down
+        _watcher["state"] = "reconnecting"
+        for collection in CACHED_COLLECTIONS:
+            await invalidate(collection)
+        await asyncio.sleep(settings.DOC_CACHE_WATCH_RETRY)
+
+
+def start_watcher():
+    if not settings.DOC_CACHE_ENABLED or _watcher["task"] is not None:
+        return
+    _watcher["task"] = asyncio.get_running_loop().create_task(_watch())
+
+
+async def stop_watcher():
+    task = _watcher["task"]
+    _watcher["task"] = None
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass
+    _watcher["state"] = "stopped"
+
+
+def stats() -> dict:
+    collections = {}
+    for collection, counters in _counters.items():
+        lookups = counters["l1_hits"] + counters["l2_hits"] + counters["misses"]
+        hits = counters["l1_hits"] + counters["l2_hits"]
+        collections[collection] = {
+            **counters,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+    return {
+        "enabled": settings.DOC_CACHE_ENABLED,
+        "l1_size": len(_l1),
+        "l1_maxsize": _l1.maxsize,
+        "change_stream": _watcher["state"],
+        "change_events": _watcher["events"],
+        "collections": collections,
+    }
@@ -0,0 +1,27 @@
+# app/services/fieldsets.py
+from typing import Dict, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+
+# Resolve a `fields=` query parameter (comma-separated API field names) against
+# the fields a resource exposes. `id` is always returned; without the parameter
+# the resource's default fieldset is used. Unknown fields are a client error.
+def parse_fields(fields: Optional[str], available: Dict[str, str], default: Sequence[str]) -> Tuple[str, ...]:
+    if not fields:
+        requested = list(default)
+    else:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in requested if field not in available]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}"
+            )
+    return tuple(dict.fromkeys(["id", *requested]))
+
+
+# Mongo projection loading only the documents' fields behind `fields`.
+# `available` maps each API field to the document field it is read from.
+def projection_for(fields: Sequence[str], available: Dict[str, str]) -> Dict[str, int]:
+    return {available[field]: 1 for field in fields if available[field] != "_id"} or {"_id": 1}
@@ -0,0 +1,16 @@
+# app/services/fingerprint.py
+import hashlib
+import json
+from typing import Any, Dict, Iterable
+
+
+# Hash the inputs that feed a generated field, so updates can tell whether
+# the stored text is still current
+def compute_fingerprint(values: Dict[str, Any], fields: Iterable[str]) -> str:
+    payload = json.dumps(
+        {field: values.get(field) for field in fields},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
@@ -0,0 +1,128 @@
+# app/services/google_tokens.py
+import asyncio
+import functools
+import logging
+import re
+import time
+from typing import Any, Dict, Optional
+
+import anyio
+import httpx
+from google.auth import jwt as google_jwt
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+# Google's signing certificates ({key id: x509 PEM}), kept for the max-age
+# Google sends with them and refreshed in the background before they expire
+_certs: Dict[str, Any] = {"certs": None, "expires_at": 0.0, "fetched_at": 0.0}
+_state: Dict[str, Any] = {"task": None, "lock": None}
+_counters = {"verifications": 0, "fetches": 0, "fetch_errors": 0, "unknown_kid_refreshes": 0}
+
+
+def _max_age(cache_control: str) -> int:
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return int(match.group(1)) if match else settings.GOOGLE_CERTS_DEFAULT_MAX_AGE
+
+
+async def _fetch():
+    _counters["fetches"] += 1
+    async with httpx.AsyncClient(timeout=settings.GOOGLE_CERTS_TIMEOUT) as client:
+        response = await client.get(CERTS_URL)
+        response.raise_for_status()
+    now = time.time()
+    _certs["certs"] = response.json()
+    _certs["fetched_at"] = now
+    _certs["expires_at"] = now + _max_age(response.headers.get("cache-control"))
+
+
+# The cached certificates, fetched first when there are none yet, they have
+# expired or `force` is set. Concurrent callers share a single fetch. If a
+# refresh fails, the previous set stays in use until one succeeds.
+async def _get_certs(force: bool = False) -> Dict[str, str]:
+    def fresh():
+        return _certs["certs"] is not None and not force and time.time() < _certs["expires_at"]
+
+    if fresh():
+        return _certs["certs"]
+    if _state["lock"] is None:
+        _state["lock"] = asyncio.Lock()
+    fetched_at = _certs["fetched_at"]
+    async with _state["lock"]:
+        # Fetched by another caller while this one waited
+        if fresh() or _certs["fetched_at"] != fetched_at:
+            return _certs["certs"]
+        try:
+            await _fetch()
+        except Exception as e:
+            _counters["fetch_errors"] += 1
+            if _certs["certs"] is None:
+                raise
+            logger.warning(f"Could not refresh Google certificates, using the cached ones: {str(e)}")
+    return _certs["certs"]
+
+
+# Verify a Google ID token for `audience` and return its claims. Raises
+# ValueError for an invalid, expired or foreign token.
+async def verify_oauth2_token(token: str, audience: Optional[str]) -> dict:
+    _counters["verifications"] += 1
+    certs = await _get_certs()
+
+    # Signed with a key that isn't in the cached set: Google may have rotated
+    # its keys early. Refetch, at most once per GOOGLE_CERTS_MIN_REFRESH seconds,
+    # so tokens with made-up key ids can't make every request fetch.
+    kid = google_jwt.decode_header(token).get("kid")
+    if kid not in certs and time.time() - _certs["fetched_at"] >= settings.GOOGLE_CERTS_MIN_REFRESH:
+        _counters["unknown_kid_refreshes"] += 1
+        certs = await _get_certs(force=True)
+
+    # Signature checks are CPU work: keep them off the event loop
+    claims = await anyio.to_thread.run_sync(functools.partial(
+        google_jwt.decode, token, certs=certs, audience=audience,
+        clock_skew_in_seconds=settings.GOOGLE_TOKEN_CLOCK_SKEW,
+    ))
+    if claims.get("iss") not in ISSUERS:
+        raise ValueError(f"Wrong issuer: {claims.get('iss')}")
+    return claims
+
+
+async def _refresh_loop():
+    while True:
+        try:
+            await _get_certs(force=True)
+        except Exception as e:
+            logger.warning(f"Could not fetch Google certificates: {str(e)}")
+        delay = _certs["expires_at"] - time.time() - settings.GOOGLE_CERTS_REFRESH_MARGIN
+        await asyncio.sleep(max(delay, settings.GOOGLE_CERTS_MIN_REFRESH))
+
+
+# Fetch the certificates ahead of the first sign-in and keep them fresh
+def start_refresher():
+    if _state["task"] is not None:
+        return
+    _state["task"] = asyncio.get_running_loop().create_task(_refresh_loop())
+
+
+async def stop_refresher():
+    task = _state["task"]
+    _state["task"] = None
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass
+
+
+def stats() -> dict:
+    return {
+        "cached_keys": len(_certs["certs"] or {}),
+        "expires_in": round(max(_certs["expires_at"] - time.time(), 0), 1),
+        "refresher_running": _state["task"] is not None,
+        **_counters,
+    }
@@ -0,0 +1,105 @@
+# app/services/llm_cache.py
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from cachetools import TLRUCache
+from config import settings
+from database.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "llm_cache:"
+
+# L1: per-process, size bounded (LRU) with a per-entry expiry taken from the
+# namespace TTL. Values are stored as (ttl, content).
+_l1 = TLRUCache(
+    maxsize=settings.LLM_CACHE_L1_MAXSIZE,
+    ttu=lambda _key, value, now: now + value[0],
+)
+
+_counters: Dict[str, Dict[str, int]] = defaultdict(
+    lambda: {"l1_hits": 0, "l2_hits": 0, "misses": 0, "bypassed": 0, "invalidations": 0}
+)
+
+
+# Build a content-addressed key from everything that shapes the completion
+def make_key(model: str, messages: List[Dict[str, Any]], params: Optional[Dict[str, Any]] = None) -> str:
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def ttl_for(namespace: str) -> int:
+    return settings.LLM_CACHE_TTLS.get(namespace, settings.LLM_CACHE_DEFAULT_TTL)
+
+
+def is_enabled(use_cache: bool = True) -> bool:
+    return settings.LLM_CACHE_ENABLED and use_cache
+
+
+def record_bypass(namespace: str):
+    _counters[namespace]["bypassed"] += 1
+
+
+async def lookup(namespace: str, key: str) -> Optional[str]:
+    entry = _l1.get(key)
+    if entry is not None:
+        _counters[namespace]["l1_hits"] += 1
+        return entry[1]
+
+    try:
+        content = await get_redis().get(KEY_PREFIX + key)
+    except Exception as e:
+        logger.warning(f"LLM cache read failed, falling back to the API: {str(e)}")
+        content = None
+
+    if content is not None:
+        _counters[namespace]["l2_hits"] += 1
+        _l1[key] = (ttl_for(namespace), content)
+        return content
+
+    _counters[namespace]["misses"] += 1
+    return None
+
+
+async def store(namespace: str, key: str, content: str):
+    ttl = ttl_for(namespace)
+    _l1[key] = (ttl, content)
+    try:
+        await get_redis().set(KEY_PREFIX + key, content, ex=ttl)
+    except Exception as e:
+        logger.warning(f"LLM cache write failed: {str(e)}")
+
+
+# Drop an entry the caller could not use, so the next call goes upstream
+async def invalidate(namespace: str, key: str):
+    _counters[namespace]["invalidations"] += 1
+    _l1.pop(key, None)
+    try:
+        await get_redis().delete(KEY_PREFIX + key)
+    except Exception as e:
+        logger.warning(f"LLM cache delete failed: {str(e)}")
+
+
+def stats() -> dict:
+    namespaces = {}
+    for namespace, counters in _counters.items():
+        lookups = counters["l1_hits"] + counters["l2_hits"] + counters["misses"]
+        hits = counters["l1_hits"] + counters["l2_hits"]
+        namespaces[namespace] = {
+            **counters,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+    return {
+        "enabled": settings.LLM_CACHE_ENABLED,
+        "l1_size": len(_l1),
+        "l1_maxsize": _l1.maxsize,
+        "namespaces": namespaces,
+    }
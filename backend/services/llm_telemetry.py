@@ -0,0 +1,293 @@
+# app/services/llm_telemetry.py
+import contextvars
+import logging
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import anyio
+from celery.signals import task_postrun, task_prerun
+from pymongo.errors import CollectionInvalid
+
+from config import settings
+from database.mongo import db
+
+logger = logging.getLogger(__name__)
+
+CALLS_COLLECTION = "llm_calls"
+HOURLY_COLLECTION = "llm_usage_hourly"
+
+# USD list prices: per 1K tokens (input, output) for chat models, per 1K
+# characters for speech and per image. Transcriptions are recorded without a
+# cost, since the audio duration isn't known here.
+CHAT_PRICES = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "llama-3.1-sonar-small-128k-online": (0.0002, 0.0002),
+    "llama-3.1-sonar-large-128k-online": (0.001, 0.001),
+}
+UNIT_PRICES = {
+    "tts-1": 0.015,
+    "tts-1-hd": 0.03,
+    "dall-e-3": 0.08,
+}
+
+# The route (ASGI scope) or Celery task the current call is made for
+_scope: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("llm_telemetry_scope", default=None)
+_task: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("llm_telemetry_task", default=None)
+# HTTP attempts made by the current call, counted by an httpx event hook
+_attempts: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("llm_telemetry_attempts", default=None)
+
+_collections_ready = False
+
+
+# ASGI middleware recording which request the LLM calls are made for. The
+# matched route is read lazily, since routing happens after the middleware.
+class TelemetryContextMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _scope.reset(token)
+
+
+@task_prerun.connect
+def _on_task_prerun(task=None, **kwargs):
+    _task.set(task.name if task is not None else None)
+
+
+@task_postrun.connect
+def _on_task_postrun(**kwargs):
+    _task.set(None)
+
+
+def current_origin() -> str:
+    task_name = _task.get()
+    if task_name:
+        return f"task:{task_name}"
+
+    scope = _scope.get()
+    if scope is None:
+        return "unknown"
+    route = scope.get("route")
+    return f"{scope.get('method')} {route.path if route is not None else scope.get('path')}"
+
+
+# Subject of the request's access token, when it carries a valid one (set by
+# services.auth_tokens.get_optional_user)
+def current_user() -> Optional[str]:
+    scope = _scope.get()
+    if scope is None:
+        return None
+    return scope.get("state", {}).get("user")
+
+
+# httpx event hook: count every attempt (including SDK retries) of the current call
+async def count_attempt(request):
+    attempts = _attempts.get()
+    if attempts is not None:
+        attempts[0] += 1
+
+
+# Price key of `model`: the model itself, or for a dated snapshot such as
+# gpt-4o-2024-08-06 the longest priced name it extends ("gpt-4o")
+def _price_key(model: Optional[str], prices: dict) -> Optional[str]:
+    if not model or model in prices:
+        return model
+    bases = [name for name in prices if model.startswith(f"{name}-")]
+    return max(bases, key=len) if bases else None
+
+
+def estimate_cost(model: Optional[str], prompt_tokens: int = 0, completion_tokens: int = 0, units: float = 0) -> Optional[float]:
+    chat_model = _price_key(model, CHAT_PRICES)
+    if chat_model in CHAT_PRICES:
+        input_price, output_price = CHAT_PRICES[chat_model]
+        return round(prompt_tokens / 1000 * input_price + completion_tokens / 1000 * output_price, 6)
+    if model in UNIT_PRICES:
+        return round(units * UNIT_PRICES[model], 6)
+    return None
+
+
+class LLMCall:
+    def __init__(self, kind: str, provider: str, model: Optional[str], cache: str = "none"):
+        self.kind = kind
+        self.provider = provider
+        self.model = model
+        self.cache = cache
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        # Thousands of characters for speech, images for image generation
+        self.units = 0
+        self.error = None
+        self.attempts = [0]
+        self.started = time.perf_counter()
+
+    def set_usage(self, prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None):
+        self.prompt_tokens = prompt_tokens or 0
+        self.completion_tokens = completion_tokens or 0
+
+    def fail(self, error: BaseException):
+        self.error = f"{error.__class__.__name__}: {str(error)}"[:500]
+
+    # Count the HTTP attempts made inside this block. Keep the block free of
+    # yields: the counter lives in a context variable.
+    @contextmanager
+    def counting_attempts(self):
+        token = _attempts.set(self.attempts)
+        try:
+            yield
+        finally:
+            _attempts.reset(token)
+
+
+# Time a provider call and record it. Usage is filled in by the caller:
+#
+#     async with llm_telemetry.track("chat", "openai", model) as call:
+#         response = await ...
+#         call.set_usage(response.usage.prompt_tokens, response.usage.completion_tokens)
+@asynccontextmanager
+async def track(kind: str, provider: str, model: Optional[str], cache: str = "none"):
+    call = LLMCall(kind, provider, model, cache)
+    try:
+        with call.counting_attempts():
+            yield call
+    except BaseException as e:
+        call.fail(e)
+        raise
+    finally:
+        # Shielded so cancelled calls (client disconnects) are still recorded
+        with anyio.CancelScope(shield=True):
+            await finish(call)
+
+
+# Record a call answered without reaching the provider (LLM cache hit or
+# coalesced with an identical in-flight call)
+async def record_cached(kind: str, provider: str, model: Optional[str], cache: str, started: float):
+    call = LLMCall(kind, provider, model, cache)
+    call.started = started
+    await finish(call)
+
+
+async def finish(call: LLMCall):
+    if not settings.LLM_TELEMETRY_ENABLED:
+        return
+
+    latency_ms = (time.perf_counter() - call.started) * 1000
+    upstream = call.cache not in ("hit", "coalesced")
+    cost = estimate_cost(call.model, call.prompt_tokens, call.completion_tokens, call.units) if upstream else 0.0
+    document = {
+        "timestamp": datetime.now(timezone.utc),
+        "origin": current_origin(),
+        "user": current_user(),
+        "kind": call.kind,
+        "provider": call.provider,
+        "model": call.model,
+        "prompt_tokens": call.prompt_tokens,
+        "completion_tokens": call.completion_tokens,
+        "units": call.units,
+        "latency_ms": round(latency_ms, 1),
+        "retries": max(call.attempts[0] - 1, 0),
+        "cache": call.cache,
+        "cost_usd": cost,
+        "error": call.error,
+    }
+    try:
+        await _write(document)
+    except Exception as e:
+        logger.warning(f"Failed to record LLM telemetry: {str(e)}")
+
+
+async def _write(document: dict):
+    await _ensure_collections()
+    await db[CALLS_COLLECTION].insert_one(document)
+
+    hour = document["timestamp"].replace(minute=0, second=0, microsecond=0)
+    await db[HOURLY_COLLECTION].update_one(
+        {
+            "hour": hour,
+            "origin": document["origin"],
+            "user": document["user"],
+            "kind": document["kind"],
+            "provider": document["provider"],
+            "model": document["model"],
+        },
+        {
+            "$inc": {
+                "calls": 1,
+                "errors": 1 if document["error"] else 0,
+                "cache_hits": 1 if document["cache"] in ("hit", "coalesced") else 0,
+                "prompt_tokens": document["prompt_tokens"],
+                "completion_tokens": document["completion_tokens"],
+                "retries": document["retries"],
+                "latency_ms_total": document["latency_ms"],
+                "cost_usd": document["cost_usd"] or 0.0,
+            },
+            "$max": {"latency_ms_max": document["latency_ms"]},
+        },
+        upsert=True,
+    )
+
+
+# Raw calls go to a capped collection (oldest records are dropped first);
+# the hourly rollups are kept for long-term reporting (indexed in database/indexes.py)
+async def _ensure_collections():
+    global _collections_ready
+    if _collections_ready:
+        return
+    try:
+        await db.create_collection(CALLS_COLLECTION, capped=True, size=settings.LLM_TELEMETRY_CAPPED_BYTES)
+    except CollectionInvalid:
+        pass
+    _collections_ready = True
+
+
+async def summary(hours: int = 24) -> dict:
+    since = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
+    totals = {
+        "calls": {"$sum": "$calls"},
+        "errors": {"$sum": "$errors"},
+        "cache_hits": {"$sum": "$cache_hits"},
+        "prompt_tokens": {"$sum": "$prompt_tokens"},
+        "completion_tokens": {"$sum": "$completion_tokens"},
+        "retries": {"$sum": "$retries"},
+        "latency_ms_total": {"$sum": "$latency_ms_total"},
+        "latency_ms_max": {"$max": "$latency_ms_max"},
+        "cost_usd": {"$sum": "$cost_usd"},
+    }
+
+    async def group_by(key):
+        rows = db[HOURLY_COLLECTION].aggregate([
+            {"$match": {"hour": {"$gte": since}}},
+            {"$group": {"_id": key, **totals}},
+            {"$sort": {"cost_usd": -1, "calls": -1}},
+        ])
+        summary = []
+        async for row in rows:
+            group = row.pop("_id")
+            latency_ms_total = row.pop("latency_ms_total")
+            row["avg_latency_ms"] = round(latency_ms_total / row["calls"], 1) if row["calls"] else 0.0
+            row["cost_usd"] = round(row["cost_usd"], 4)
+            summary.append({**(group or {}), **row})
+        return summary
+
+    overall = await group_by(None)
+    return {
+        "since": since,
+        "hours": hours,
+        "total": overall[0] if overall else {},
+        "by_origin": await group_by({"origin": "$origin"}),
+        "by_user": await group_by({"user": "$user"}),
+        "by_model": await group_by({"provider": "$provider", "kind": "$kind", "model": "$model"}),
+    }
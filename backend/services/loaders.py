@@ -0,0 +1,76 @@
+# app/services/loaders.py
+import contextvars
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+
+from database.mongo import db
+from services import doc_cache
+
+# Documents already loaded while handling the current request, keyed by
+# (collection, cache epoch, projected fields, id): a write invalidating the
+# collection in the document cache also hides what was loaded before it.
+# None outside of a request.
+_cache: contextvars.ContextVar[Optional[Dict[Tuple, Optional[dict]]]] = contextvars.ContextVar(
+    "request_document_cache", default=None
+)
+
+
+# ASGI middleware giving every request its own document cache, so ids that
+# are resolved more than once while handling it cost a single round trip
+class RequestCacheMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _cache.set({})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _cache.reset(token)
+
+
+def _projection_key(projection: Optional[Dict[str, Any]]):
+    return tuple(sorted(projection)) if projection else None
+
+
+# Load the documents with the given ids from `collection` with one $in query,
+# in the order of `ids` (None for ids that don't exist or aren't valid).
+# Documents loaded earlier in the same request, or held by the document
+# cache for the cached collections, are not fetched again.
+async def load_many(collection: str, ids: Iterable[str], projection: Optional[Dict[str, Any]] = None) -> List[Optional[dict]]:
+    ids = [str(id) for id in ids]
+    key = (doc_cache.current_epoch(collection), _projection_key(projection))
+    cache = _cache.get()
+    if cache is None:
+        cache = {}
+
+    missing = list(dict.fromkeys(
+        id for id in ids if (collection, key, id) not in cache and ObjectId.is_valid(id)
+    ))
+    if missing and doc_cache.is_enabled(collection):
+        cached = await doc_cache.get_many(collection, missing, projection)
+        for id, document in cached.items():
+            cache[(collection, key, id)] = document
+        missing = [id for id in missing if id not in cached]
+
+    if missing:
+        epoch = doc_cache.current_epoch(collection)
+        loaded = dict.fromkeys(missing)
+        query = {"_id": {"$in": [ObjectId(id) for id in missing]}}
+        async for document in db[collection].find(query, projection):
+            loaded[str(document["_id"])] = document
+        if doc_cache.is_enabled(collection):
+            await doc_cache.put_many(collection, loaded, projection, epoch)
+        for id, document in loaded.items():
+            cache[(collection, key, id)] = document
+
+    return [cache.get((collection, key, id)) for id in ids]
+
+
+async def load_one(collection: str, id: str, projection: Optional[Dict[str, Any]] = None) -> Optional[dict]:
+    return (await load_many(collection, [id], projection))[0]
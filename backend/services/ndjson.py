@@ -0,0 +1,30 @@
+# app/services/ndjson.py
+import json
+from typing import Any, AsyncIterator
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+# True when the client asked for newline-delimited JSON instead of an array
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def _lines(items: AsyncIterator[Any]) -> AsyncIterator[str]:
+    async for item in items:
+        yield json.dumps(jsonable_encoder(item)) + "\n"
+
+
+# Stream an async iterator of documents (dicts or models) as one JSON object
+# per line, so memory stays constant however many documents there are.
+# Starlette cancels the iterator when the client disconnects.
+def ndjson_stream(items: AsyncIterator[Any]) -> StreamingResponse:
+    return StreamingResponse(
+        _lines(items),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,268 @@
+# app/services/openai_client.py
+import asyncio
+import time
+import weakref
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import anyio
+import httpx
+from openai import AsyncOpenAI
+from config import settings
+from services import llm_cache, llm_telemetry, rate_limiter, singleflight
+
+# One client (and one connection pool) per running event loop. Uvicorn runs a
+# single loop per worker, while Celery tasks spin up their own loops, so the
+# client can't simply be created at import time.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def get_client() -> AsyncOpenAI:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPENAI_MAX_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(settings.OPENAI_TIMEOUT, connect=settings.OPENAI_CONNECT_TIMEOUT),
+            event_hooks={"request": [llm_telemetry.count_attempt]},
+        )
+        client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            http_client=http_client,
+            max_retries=settings.OPENAI_MAX_RETRIES,
+        )
+        _clients[loop] = client
+    return client
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENCY)
+        _semaphores[loop] = semaphore
+    return semaphore
+
+
+# Run a chat completion and return the text of the first choice. Passing a
+# cache_namespace serves identical (model, messages, params) requests from the
+# LLM cache; use_cache=False bypasses it for a single call. Callers that parse
+# the text pass their parser as `validate`: a completion it raises on is never
+# cached, and a cached one it raises on is evicted and requested again.
+async def chat_completion(
+    messages: List[Dict[str, str]],
+    model: str = "gpt-4",
+    timeout: Optional[float] = None,
+    cache_namespace: Optional[str] = None,
+    use_cache: bool = True,
+    validate: Optional[Callable[[str], Any]] = None,
+    **params,
+) -> str:
+    if cache_namespace is None:
+        return await _create_chat_completion(messages, model, timeout, **params)
+
+    if not llm_cache.is_enabled(use_cache):
+        llm_cache.record_bypass(cache_namespace)
+        return await _create_chat_completion(messages, model, timeout, cache_status="bypass", **params)
+
+    started = time.perf_counter()
+    key = llm_cache.make_key(model, messages, params)
+    cached = await llm_cache.lookup(cache_namespace, key)
+    if cached is not None and not _is_valid(cached, validate):
+        await llm_cache.invalidate(cache_namespace, key)
+        cached = None
+    if cached is not None:
+        await llm_telemetry.record_cached("chat", "openai", model, "hit", started)
+        return cached
+
+    # Identical requests already in flight (in this or another worker) share one call
+    called_upstream = False
+
+    async def create_and_store():
+        nonlocal called_upstream
+        called_upstream = True
+        content = await _create_chat_completion(messages, model, timeout, cache_status="miss", **params)
+        # Raises for an unusable completion: not cached, nor shared with followers
+        if validate is not None:
+            validate(content)
+        await llm_cache.store(cache_namespace, key, content)
+        return content
+
+    content = await singleflight.do(
+        f"openai:{key}",
+        create_and_store,
+        encode=lambda content: content,
+        decode=lambda content: content,
+    )
+    if not called_upstream:
+        await llm_telemetry.record_cached("chat", "openai", model, "coalesced", started)
+    return content
+
+
+def _is_valid(content: str, validate: Optional[Callable[[str], Any]]) -> bool:
+    if validate is None:
+        return True
+    try:
+        validate(content)
+        return True
+    except Exception:
+        return False
+
+
+# Rough token count used to reserve rate limit capacity before a call
+# (about four characters per token, plus the expected completion)
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: Optional[int] = None) -> int:
+    prompt_chars = sum(len(str(message.get("content") or "")) for message in messages)
+    return prompt_chars // 4 + (max_tokens or settings.RATE_LIMIT_OPENAI_COMPLETION_ESTIMATE)
+
+
+async def _create_chat_completion(
+    messages: List[Dict[str, str]],
+    model: str,
+    timeout: Optional[float] = None,
+    cache_status: str = "none",
+    **params,
+) -> str:
+    reserved_tokens = estimate_tokens(messages, params.get("max_tokens"))
+    await rate_limiter.acquire("openai", settings.OPENAI_API_KEY, tokens=reserved_tokens)
+    async with _get_semaphore():
+        async with llm_telemetry.track("chat", "openai", model, cache=cache_status) as call:
+            response = await get_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                timeout=timeout or settings.OPENAI_TIMEOUT,
+                **params,
+            )
+            if response is not None and response.usage is not None:
+                call.set_usage(response.usage.prompt_tokens, response.usage.completion_tokens)
+
+    if response is not None and response.usage is not None:
+        await rate_limiter.settle("openai", settings.OPENAI_API_KEY, reserved_tokens, response.usage.total_tokens)
+
+    if not response or not response.choices:
+        raise ValueError("Failed to get a valid response from OpenAI API")
+
+    return response.choices[0].message.content
+
+
+# Stream a chat completion, yielding content deltas as they arrive. Cached
+# completions are replayed as a single delta; a fully streamed completion is
+# stored in the cache. Closing the generator (e.g. when the HTTP client
+# disconnects) closes the upstream response instead of leaking it.
+async def stream_chat_completion(
+    messages: List[Dict[str, str]],
+    model: str = "gpt-4",
+    timeout: Optional[float] = None,
+    cache_namespace: Optional[str] = None,
+    use_cache: bool = True,
+    **params,
+) -> AsyncIterator[str]:
+    key = None
+    cache_status = "none"
+    if cache_namespace is not None:
+        if llm_cache.is_enabled(use_cache):
+            started = time.perf_counter()
+            key = llm_cache.make_key(model, messages, params)
+            cached = await llm_cache.lookup(cache_namespace, key)
+            if cached is not None:
+                await llm_telemetry.record_cached("chat", "openai", model, "hit", started)
+                yield cached
+                return
+            cache_status = "miss"
+        else:
+            llm_cache.record_bypass(cache_namespace)
+            cache_status = "bypass"
+
+    parts = []
+    usage = None
+    reserved_tokens = estimate_tokens(messages, params.get("max_tokens"))
+    await rate_limiter.acquire("openai", settings.OPENAI_API_KEY, tokens=reserved_tokens)
+    async with _get_semaphore():
+        # Not llm_telemetry.track(): its context variable can't span the yields below
+        call = llm_telemetry.LLMCall("chat_stream", "openai", model, cache_status)
+        try:
+            with call.counting_attempts():
+                stream = await get_client().chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    timeout=timeout or settings.OPENAI_TIMEOUT,
+                    **params,
+                )
+            try:
+                async for chunk in stream:
+                    # The final chunk carries the usage and no choices
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                        call.set_usage(usage.prompt_tokens, usage.completion_tokens)
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+            finally:
+                # Shielded so the connection is released (and the reservation
+                # settled) even when we are being cancelled. A stream closed
+                # before its final chunk keeps the estimate.
+                with anyio.CancelScope(shield=True):
+                    await stream.close()
+                    if usage is not None:
+                        await rate_limiter.settle("openai", settings.OPENAI_API_KEY, reserved_tokens, usage.total_tokens)
+        except BaseException as e:
+            call.fail(e)
+            raise
+        finally:
+            with anyio.CancelScope(shield=True):
+                await llm_telemetry.finish(call)
+
+    if key is not None:
+        await llm_cache.store(cache_namespace, key, "".join(parts))
+
+
+# Transcribe an audio file (path or file object) with Whisper
+async def transcribe_audio(file, model: str = "whisper-1", timeout: Optional[float] = None) -> str:
+    await rate_limiter.acquire("openai", settings.OPENAI_API_KEY)
+    async with _get_semaphore():
+        async with llm_telemetry.track("transcription", "openai", model):
+            response = await get_client().audio.transcriptions.create(
+                model=model,
+                file=file,
+                timeout=timeout or settings.OPENAI_TIMEOUT,
+            )
+    return response.text
+
+
+# Generate speech audio for the given text and return the raw bytes
+async def synthesize_speech(
+    text: str,
+    voice: str = "alloy",
+    model: str = "tts-1",
+    response_format: str = "mp3",
+    timeout: Optional[float] = None,
+) -> bytes:
+    await rate_limiter.acquire("openai", settings.OPENAI_API_KEY)
+    async with _get_semaphore():
+        async with llm_telemetry.track("speech", "openai", model) as call:
+            call.units = len(text) / 1000
+            response = await get_client().audio.speech.create(
+                model=model,
+                voice=voice,
+                input=text,
+                response_format=response_format,
+                timeout=timeout or settings.OPENAI_TIMEOUT,
+            )
+            audio = await response.aread()
+    return audio
+
+
+# Close the clients opened by this process (called on application shutdown)
+async def close_clients():
+    loop = asyncio.get_running_loop()
+    client = _clients.pop(loop, None)
+    if client is not None:
+        await client.close()
@@ -0,0 +1,91 @@
+# app/services/pagination.py
+import base64
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import json_util
+from fastapi import HTTPException, Query, Response
+from pymongo import ASCENDING
+
+from config import settings
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+# Query parameters shared by every paginated list endpoint (use with Depends()).
+# Every response is one page: clients follow X-Next-Cursor for the rest.
+class PageParams:
+    def __init__(
+        self,
+        limit: int = Query(settings.PAGINATION_DEFAULT_LIMIT, ge=1, le=settings.PAGINATION_MAX_LIMIT),
+        cursor: Optional[str] = Query(None, description="next_cursor returned by the previous page"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+
+# Cursors are opaque to clients: the sort field and the position of the last
+# item of the previous page, as URL-safe base64 of extended JSON
+def encode_cursor(sort_field: str, document: Dict[str, Any]) -> str:
+    position = {"f": sort_field, "id": document["_id"]}
+    if sort_field != "_id":
+        position["v"] = document.get(sort_field)
+    return base64.urlsafe_b64encode(json_util.dumps(position).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_field: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(position, dict) or position.get("f") != sort_field or "id" not in position:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return position
+
+
+def _after(position: Dict[str, Any], sort_field: str, direction: int) -> Dict[str, Any]:
+    op = "$gt" if direction == ASCENDING else "$lt"
+    if sort_field == "_id":
+        return {"_id": {op: position["id"]}}
+    # Ties on the sort field are broken by _id
+    return {"$or": [
+        {sort_field: {op: position["v"]}},
+        {sort_field: position["v"], "_id": {op: position["id"]}},
+    ]}
+
+
+# Fetch one page of `collection` in (sort_field, _id) order, seeking past the
+# cursor instead of skipping. Returns the documents and the cursor of the next
+# page (None on the last page). limit defaults to PAGINATION_DEFAULT_LIMIT and
+# is capped at PAGINATION_MAX_LIMIT.
+async def paginate(
+    collection,
+    query: Optional[Dict[str, Any]] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    sort_field: str = "_id",
+    direction: int = ASCENDING,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    query = dict(query or {})
+    sort = [("_id", direction)] if sort_field == "_id" else [(sort_field, direction), ("_id", direction)]
+    if limit is None:
+        limit = settings.PAGINATION_DEFAULT_LIMIT
+    limit = max(1, min(limit, settings.PAGINATION_MAX_LIMIT))
+    if cursor:
+        seek = _after(decode_cursor(cursor, sort_field), sort_field, direction)
+        query = {"$and": [query, seek]} if query else seek
+
+    # One extra document tells whether there is a next page
+    documents = await collection.find(query, projection).sort(sort).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(sort_field, documents[-1])
+    return documents, next_cursor
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
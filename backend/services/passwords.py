@@ -0,0 +1,42 @@
+# app/services/passwords.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+from config import settings
+
+# Hashes with a work factor other than PASSWORD_BCRYPT_ROUNDS (raised or
+# lowered) are reported as needing an update, and rehashed on the next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+)
+
+# bcrypt takes a few hundred milliseconds of CPU per hash and releases the
+# GIL, so it runs on its own bounded pool: the event loop keeps serving other
+# requests, and a burst of logins queues here instead of exhausting the
+# default thread pool used by the rest of the app
+_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+
+async def _run(function, *args):
+    return await asyncio.get_running_loop().run_in_executor(_executor, function, *args)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(pwd_context.hash, password)
+
+
+# Check `password` against `hashed_password`. Also returns a new hash when the
+# stored one was made with another work factor (None otherwise); the caller
+# stores it so hashes follow PASSWORD_BCRYPT_ROUNDS as users log in.
+async def verify_password(password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    if not hashed_password:
+        # Accounts registered with Google have no password
+        return False, None
+    return await _run(pwd_context.verify_and_update, password, hashed_password)
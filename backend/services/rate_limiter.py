@@ -0,0 +1,243 @@
+# app/services/rate_limiter.py
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, Optional, Tuple
+
+from config import settings
+from database.redis_client import get_redis, get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ratelimit:"
+
+# Reserve capacity in the request bucket and (optionally) the token bucket.
+# Each bucket stores its "theoretical arrival time" (GCRA): every caller gets
+# the next free slot in the order it reached Redis, so waiting callers are
+# served first-come first-served across all processes. Returns {allowed, wait_ms};
+# nothing is reserved when the wait would exceed the maximum.
+_RESERVE = """
+local t = redis.call("TIME")
+local now = tonumber(t[1]) * 1000 + tonumber(t[2]) / 1000
+local max_wait = tonumber(ARGV[6])
+
+local function next_slot(key, cost, tolerance)
+    local tat = tonumber(redis.call("GET", key) or now)
+    if tat < now then tat = now end
+    local new_tat = tat + cost
+    return new_tat, math.max(0, new_tat - tolerance - now)
+end
+
+local request_tat, wait = next_slot(KEYS[1], tonumber(ARGV[1]), tonumber(ARGV[2]))
+local token_tat = nil
+if tonumber(ARGV[3]) > 0 and tonumber(ARGV[5]) > 0 then
+    local token_wait
+    token_tat, token_wait = next_slot(KEYS[2], tonumber(ARGV[3]) * tonumber(ARGV[5]), tonumber(ARGV[4]))
+    wait = math.max(wait, token_wait)
+end
+
+if wait > max_wait then
+    return {0, tostring(wait)}
+end
+
+redis.call("SET", KEYS[1], tostring(request_tat), "PX", math.ceil(request_tat - now) + 1000)
+if token_tat then
+    redis.call("SET", KEYS[2], tostring(token_tat), "PX", math.ceil(token_tat - now) + 1000)
+end
+return {1, tostring(wait)}
+"""
+
+# Correct a token bucket once the real usage of a call is known
+_SETTLE = """
+local tat = redis.call("GET", KEYS[1])
+if not tat then return 0 end
+local t = redis.call("TIME")
+local now = tonumber(t[1]) * 1000 + tonumber(t[2]) / 1000
+local new_tat = math.max(tonumber(tat) + tonumber(ARGV[1]), now)
+redis.call("SET", KEYS[1], tostring(new_tat), "PX", math.ceil(new_tat - now) + 1000)
+return 1
+"""
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+# Used while Redis is unreachable: the same reservation logic, per process
+_local_buckets: Dict[str, float] = {}
+_local_lock = threading.Lock()
+
+_counters: Dict[str, Dict[str, float]] = defaultdict(
+    lambda: {
+        "acquired": 0,
+        "delayed": 0,
+        "rejected": 0,
+        "redis_errors": 0,
+        "queue_depth": 0,
+        "max_queue_depth": 0,
+        "total_wait_seconds": 0.0,
+        "max_wait_seconds": 0.0,
+    }
+)
+_recent_waits: Dict[str, deque] = defaultdict(lambda: deque(maxlen=1024))
+
+
+def _bucket_keys(provider: str, api_key: Optional[str]) -> Tuple[str, str]:
+    key_id = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16] if api_key else "default"
+    base = f"{KEY_PREFIX}{provider}:{key_id}"
+    return f"{base}:requests", f"{base}:tokens"
+
+
+def _reserve_args(limits: dict, tokens: int):
+    request_cost = 1000.0 / limits["rps"]
+    request_tolerance = request_cost * max(limits["burst"], 1)
+    token_cost = 60000.0 / limits["tpm"] if limits["tpm"] > 0 else 0
+    # A single call can never need more than a minute's worth of tokens
+    tokens = min(tokens, limits["tpm"]) if limits["tpm"] > 0 else 0
+    return request_cost, request_tolerance, token_cost, 60000.0, tokens, settings.RATE_LIMIT_MAX_WAIT * 1000
+
+
+def _reserve_locally(keys, request_cost, request_tolerance, token_cost, token_tolerance, tokens, max_wait):
+    now = time.monotonic() * 1000
+    with _local_lock:
+        slots = [(keys[0], request_cost, request_tolerance)]
+        if token_cost > 0 and tokens > 0:
+            slots.append((keys[1], token_cost * tokens, token_tolerance))
+
+        wait = 0.0
+        new_tats = {}
+        for key, cost, tolerance in slots:
+            new_tat = max(_local_buckets.get(key, now), now) + cost
+            new_tats[key] = new_tat
+            wait = max(wait, new_tat - tolerance - now)
+
+        if wait > max_wait:
+            return 0, wait
+        _local_buckets.update(new_tats)
+        return 1, wait
+
+
+def _limits_for(provider: str) -> Optional[dict]:
+    if not settings.RATE_LIMIT_ENABLED:
+        return None
+    limits = settings.RATE_LIMITS.get(provider)
+    if not limits or limits["rps"] <= 0:
+        return None
+    return limits
+
+
+def _check_reservation(provider: str, allowed, wait_ms) -> float:
+    wait = max(float(wait_ms), 0.0) / 1000
+    if not int(allowed):
+        _counters[provider]["rejected"] += 1
+        raise RateLimitExceeded(
+            f"{provider} rate limit: next slot in {wait:.1f}s exceeds the {settings.RATE_LIMIT_MAX_WAIT:.0f}s maximum wait"
+        )
+    return wait
+
+
+def _enter_queue(provider: str):
+    counters = _counters[provider]
+    counters["queue_depth"] += 1
+    counters["max_queue_depth"] = max(counters["max_queue_depth"], counters["queue_depth"])
+
+
+def _record(provider: str, wait: float):
+    counters = _counters[provider]
+    counters["acquired"] += 1
+    if wait > 0:
+        counters["delayed"] += 1
+        counters["total_wait_seconds"] += wait
+        counters["max_wait_seconds"] = max(counters["max_wait_seconds"], wait)
+    _recent_waits[provider].append(wait)
+
+
+# Wait for a slot for one call to `provider` using `tokens` tokens. The limit
+# is shared by every process using the same API key. Returns the seconds
+# waited; raises RateLimitExceeded if the queue is longer than RATE_LIMIT_MAX_WAIT.
+async def acquire(provider: str, api_key: Optional[str] = None, tokens: int = 0) -> float:
+    limits = _limits_for(provider)
+    if limits is None:
+        return 0.0
+
+    keys = _bucket_keys(provider, api_key)
+    args = _reserve_args(limits, tokens)
+    try:
+        allowed, wait_ms = await get_redis().eval(_RESERVE, 2, *keys, *args)
+    except Exception as e:
+        _counters[provider]["redis_errors"] += 1
+        logger.warning(f"Rate limiter unavailable, limiting {provider} per process: {str(e)}")
+        allowed, wait_ms = _reserve_locally(keys, *args)
+
+    wait = _check_reservation(provider, allowed, wait_ms)
+    if wait > 0:
+        _enter_queue(provider)
+        try:
+            await asyncio.sleep(wait)
+        finally:
+            _counters[provider]["queue_depth"] -= 1
+    _record(provider, wait)
+    return wait
+
+
+# Blocking variant of acquire() for synchronous code
+def acquire_sync(provider: str, api_key: Optional[str] = None, tokens: int = 0) -> float:
+    limits = _limits_for(provider)
+    if limits is None:
+        return 0.0
+
+    keys = _bucket_keys(provider, api_key)
+    args = _reserve_args(limits, tokens)
+    try:
+        allowed, wait_ms = get_sync_redis().eval(_RESERVE, 2, *keys, *args)
+    except Exception as e:
+        _counters[provider]["redis_errors"] += 1
+        logger.warning(f"Rate limiter unavailable, limiting {provider} per process: {str(e)}")
+        allowed, wait_ms = _reserve_locally(keys, *args)
+
+    wait = _check_reservation(provider, allowed, wait_ms)
+    if wait > 0:
+        _enter_queue(provider)
+        try:
+            time.sleep(wait)
+        finally:
+            _counters[provider]["queue_depth"] -= 1
+    _record(provider, wait)
+    return wait
+
+
+# Give back (or take) the difference between the tokens reserved for a call
+# and the tokens it actually used
+async def settle(provider: str, api_key: Optional[str], reserved_tokens: int, used_tokens: int):
+    limits = _limits_for(provider)
+    if limits is None or limits["tpm"] <= 0 or used_tokens == reserved_tokens:
+        return
+
+    _, token_key = _bucket_keys(provider, api_key)
+    delta = (used_tokens - reserved_tokens) * 60000.0 / limits["tpm"]
+    try:
+        await get_redis().eval(_SETTLE, 1, token_key, delta)
+    except Exception as e:
+        _counters[provider]["redis_errors"] += 1
+        logger.warning(f"Failed to settle {provider} token usage: {str(e)}")
+
+
+def stats() -> dict:
+    providers = {}
+    for provider, counters in _counters.items():
+        waits = sorted(_recent_waits[provider])
+        providers[provider] = {
+            **counters,
+            "avg_wait_seconds": round(counters["total_wait_seconds"] / counters["acquired"], 4) if counters["acquired"] else 0.0,
+            "p50_wait_seconds": round(waits[len(waits) // 2], 4) if waits else 0.0,
+            "p99_wait_seconds": round(waits[min(len(waits) - 1, math.ceil(len(waits) * 0.99) - 1)], 4) if waits else 0.0,
+        }
+    return {
+        "enabled": settings.RATE_LIMIT_ENABLED,
+        "limits": settings.RATE_LIMITS,
+        "providers": providers,
+    }
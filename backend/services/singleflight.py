@@ -0,0 +1,176 @@
+# app/services/singleflight.py
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from config import settings
+from database.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+LOCK_PREFIX = "singleflight:lock:"
+RESULT_PREFIX = "singleflight:result:"
+
+# Delete the lock only if we still own it
+_RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+_inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Future]]" = weakref.WeakKeyDictionary()
+
+_counters = {"leaders": 0, "coalesced_local": 0, "coalesced_remote": 0, "not_shared": 0, "redis_errors": 0}
+
+# Set on the leader's future when its result must not be shared
+_NOT_SHARED = object()
+
+
+# Scheme and host are case-insensitive, path and query are not: only the
+# former are lowercased, so distinct pages never share a flight
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, parts.query, parts.fragment)).rstrip("/")
+
+
+# Build a flight key from a namespace and the request parts. Parts are used
+# as given: callers normalize what is safe to normalize (see normalize_url).
+def make_key(namespace: str, *parts: Any) -> str:
+    payload = json.dumps(list(parts), sort_keys=True, ensure_ascii=False, default=str)
+    return f"{namespace}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def _get_inflight() -> Dict[str, asyncio.Future]:
+    loop = asyncio.get_running_loop()
+    inflight = _inflight.get(loop)
+    if inflight is None:
+        inflight = {}
+        _inflight[loop] = inflight
+    return inflight
+
+
+# Run fn() once for all concurrent callers sharing the same key. Within a
+# worker, followers await the leader's future. When encode/decode are given
+# the result is also shared across workers through a Redis lock: the worker
+# holding the lock publishes the encoded result, the others wait for it.
+# Upstream helpers that return a failure value instead of raising pass
+# should_share: a result it rejects goes to the leader only, and every
+# follower makes its own call rather than reusing a transient failure.
+async def do(
+    key: str,
+    fn: Callable[[], Awaitable[Any]],
+    encode: Optional[Callable[[Any], Any]] = None,
+    decode: Optional[Callable[[Any], Any]] = None,
+    should_share: Optional[Callable[[Any], bool]] = None,
+) -> Any:
+    inflight = _get_inflight()
+
+    while True:
+        future = inflight.get(key)
+        if future is None:
+            break
+        try:
+            result = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # The leader was cancelled (its client went away): take over
+            if future.cancelled():
+                continue
+            raise
+        if result is _NOT_SHARED:
+            return await fn()
+        _counters["coalesced_local"] += 1
+        return result
+
+    future = asyncio.get_running_loop().create_future()
+    # Nobody may be waiting on the future; don't warn about unretrieved errors
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    inflight[key] = future
+    _counters["leaders"] += 1
+    try:
+        if encode is not None and decode is not None:
+            result = await _run_distributed(key, fn, encode, decode, should_share)
+        else:
+            result = await fn()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    else:
+        if should_share is not None and not should_share(result):
+            _counters["not_shared"] += 1
+            future.set_result(_NOT_SHARED)
+        else:
+            future.set_result(result)
+        return result
+    finally:
+        if inflight.get(key) is future:
+            del inflight[key]
+
+
+async def _run_distributed(key, fn, encode, decode, should_share=None):
+    lock_key = LOCK_PREFIX + key
+    result_key = RESULT_PREFIX + key
+    token = uuid.uuid4().hex
+
+    try:
+        redis = get_redis()
+        acquired = await redis.set(lock_key, token, nx=True, px=int(settings.SINGLEFLIGHT_LOCK_TTL * 1000))
+    except Exception as e:
+        _counters["redis_errors"] += 1
+        logger.warning(f"Single-flight lock unavailable, running {key} locally: {str(e)}")
+        return await fn()
+
+    if acquired:
+        try:
+            result = await fn()
+            if should_share is not None and not should_share(result):
+                # Not published: the others call upstream once the lock is released
+                return result
+            try:
+                await redis.set(result_key, json.dumps(encode(result), default=str),
+                                px=int(settings.SINGLEFLIGHT_RESULT_TTL * 1000))
+            except Exception as e:
+                _counters["redis_errors"] += 1
+                logger.warning(f"Failed to publish single-flight result for {key}: {str(e)}")
+            return result
+        finally:
+            try:
+                await redis.eval(_RELEASE_LOCK, 1, lock_key, token)
+            except Exception as e:
+                _counters["redis_errors"] += 1
+                logger.warning(f"Failed to release single-flight lock for {key}: {str(e)}")
+
+    # Another worker is making the call: wait for its result. If it finishes
+    # without publishing one (it failed) or takes too long, call upstream ourselves.
+    deadline = time.monotonic() + settings.SINGLEFLIGHT_WAIT_TIMEOUT
+    try:
+        while time.monotonic() < deadline:
+            raw = await redis.get(result_key)
+            if raw is not None:
+                _counters["coalesced_remote"] += 1
+                return decode(json.loads(raw))
+            if not await redis.exists(lock_key):
+                raw = await redis.get(result_key)
+                if raw is not None:
+                    _counters["coalesced_remote"] += 1
+                    return decode(json.loads(raw))
+                break
+            await asyncio.sleep(settings.SINGLEFLIGHT_POLL_INTERVAL)
+    except Exception as e:
+        _counters["redis_errors"] += 1
+        logger.warning(f"Single-flight wait failed for {key}: {str(e)}")
+
+    return await fn()
+
+
+def stats() -> dict:
+    return dict(_counters)
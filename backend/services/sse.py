@@ -0,0 +1,27 @@
+# app/services/sse.py
+import json
+from typing import AsyncIterator, Optional
+
+from fastapi.responses import StreamingResponse
+
+
+# Format one server-sent event with a JSON payload
+def format_event(data, event: Optional[str] = None) -> str:
+    message = ""
+    if event:
+        message += f"event: {event}\n"
+    message += f"data: {json.dumps(data, default=str)}\n\n"
+    return message
+
+
+# Wrap an async generator of formatted events in a streaming response.
+# Starlette cancels the generator when the client disconnects.
+def event_stream(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
@@ -0,0 +1,65 @@
+# app/services/users.py
+from typing import Optional
+
+from cachetools import TTLCache
+from sqlalchemy import bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models.auth_model import User
+
+# Only the columns the auth flows read. Built once, so SQLAlchemy compiles it
+# once and asyncpg reuses the prepared statement on each connection.
+_by_email = select(User.id, User.email, User.hashed_password).where(User.email == bindparam("email"))
+
+# User rows by email, and emails known not to exist. Both are per process,
+# so another worker's writes show up once the entries expire: keep the
+# negative TTL short, since a new user can't log in before it runs out.
+_users = TTLCache(maxsize=settings.USER_CACHE_MAXSIZE, ttl=settings.USER_CACHE_TTL)
+_missing = TTLCache(maxsize=settings.USER_CACHE_MAXSIZE, ttl=settings.USER_NEGATIVE_CACHE_TTL)
+_counters = {"hits": 0, "negative_hits": 0, "misses": 0, "bypassed": 0, "invalidations": 0}
+
+
+# id, email and hashed_password of the user with this email, or None.
+# Existence checks before an insert pass use_cache=False: another worker's
+# stale entry must not let a duplicate through (or block a new user).
+async def get_by_email(email: str, db: AsyncSession, use_cache: bool = True):
+    if not use_cache:
+        _counters["bypassed"] += 1
+        return (await db.execute(_by_email, {"email": email})).first()
+
+    if settings.USER_CACHE_ENABLED:
+        user = _users.get(email)
+        if user is not None:
+            _counters["hits"] += 1
+            return user
+        if email in _missing:
+            _counters["negative_hits"] += 1
+            return None
+
+    _counters["misses"] += 1
+    user = (await db.execute(_by_email, {"email": email})).first()
+    if settings.USER_CACHE_ENABLED:
+        if user is None:
+            _missing[email] = True
+        else:
+            _users[email] = user
+    return user
+
+
+# After creating, activating or updating the user with this email
+def invalidate(email: Optional[str]):
+    _counters["invalidations"] += 1
+    _users.pop(email, None)
+    _missing.pop(email, None)
+
+
+def stats() -> dict:
+    lookups = _counters["hits"] + _counters["negative_hits"] + _counters["misses"]
+    return {
+        "enabled": settings.USER_CACHE_ENABLED,
+        "users_cached": len(_users),
+        "missing_cached": len(_missing),
+        **_counters,
+        "hit_ratio": round((lookups - _counters["misses"]) / lookups, 4) if lookups else 0.0,
+    }
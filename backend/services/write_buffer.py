@@ -0,0 +1,137 @@
+# app/services/write_buffer.py
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from config import settings
+from database.mongo import db
+
+logger = logging.getLogger(__name__)
+
+# Append-only collections written behind the request: nothing reads a record
+# back right after it's saved, so inserts are batched into insert_many calls
+BUFFERED_COLLECTIONS = ("conversations", "image_generations")
+
+_pending: Dict[str, Deque[dict]] = {collection: deque() for collection in BUFFERED_COLLECTIONS}
+_state: Dict[str, Any] = {"task": None, "wakeup": None, "lock": None}
+_counters = {"enqueued": 0, "written": 0, "flushes": 0, "failed_flushes": 0, "dropped": 0, "write_through": 0}
+
+
+def _size() -> int:
+    return sum(len(documents) for documents in _pending.values())
+
+
+def is_running() -> bool:
+    return _state["task"] is not None
+
+
+# Queue `document` for insertion into `collection` and return its _id, which
+# is assigned here so callers can hand it out before the write. Without a
+# running flusher (workers, scripts) or with the buffer full even after a
+# flush (Mongo unavailable), the document is written directly instead, so
+# memory stays bounded and errors reach the caller as before.
+async def enqueue(collection: str, document: dict) -> ObjectId:
+    document.setdefault("_id", ObjectId())
+    if not is_running() or collection not in _pending:
+        await _write_through(collection, document)
+        return document["_id"]
+
+    if _size() >= settings.WRITE_BUFFER_MAX_PENDING:
+        await flush()
+        if _size() >= settings.WRITE_BUFFER_MAX_PENDING:
+            await _write_through(collection, document)
+            return document["_id"]
+
+    _pending[collection].append(document)
+    _counters["enqueued"] += 1
+    if len(_pending[collection]) >= settings.WRITE_BUFFER_FLUSH_SIZE:
+        _state["wakeup"].set()
+    return document["_id"]
+
+
+async def _write_through(collection: str, document: dict):
+    _counters["write_through"] += 1
+    await db[collection].insert_one(document)
+
+
+def _take(collection: str) -> List[dict]:
+    documents = _pending[collection]
+    return [documents.popleft() for _ in range(min(len(documents), settings.WRITE_BUFFER_FLUSH_SIZE))]
+
+
+# Write out everything pending, WRITE_BUFFER_FLUSH_SIZE documents per
+# insert_many. A batch that fails as a whole goes back to the front of the
+# queue for the next flush; documents Mongo rejects individually are dropped.
+async def flush():
+    lock = _state["lock"] or asyncio.Lock()
+    async with lock:
+        for collection in BUFFERED_COLLECTIONS:
+            while _pending[collection]:
+                batch = _take(collection)
+                try:
+                    await db[collection].insert_many(batch, ordered=False)
+                    _counters["written"] += len(batch)
+                except BulkWriteError as e:
+                    errors = e.details.get("writeErrors", [])
+                    # Duplicate _ids were written by an earlier, partly failed attempt
+                    rejected = [error for error in errors if error.get("code") != 11000]
+                    _counters["written"] += len(batch) - len(rejected)
+                    _counters["dropped"] += len(rejected)
+                    for error in rejected:
+                        logger.error(f"Dropped buffered write to {collection}: {error.get('errmsg')}")
+                except Exception as e:
+                    _pending[collection].extendleft(reversed(batch))
+                    _counters["failed_flushes"] += 1
+                    logger.warning(f"Buffered write to {collection} failed, will retry: {str(e)}")
+                    return
+                _counters["flushes"] += 1
+
+
+async def _run():
+    while is_running():
+        try:
+            await asyncio.wait_for(_state["wakeup"].wait(), timeout=settings.WRITE_BUFFER_FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _state["wakeup"].clear()
+        await flush()
+
+
+def start():
+    if not settings.WRITE_BUFFER_ENABLED or is_running():
+        return
+    _state["wakeup"] = asyncio.Event()
+    _state["lock"] = asyncio.Lock()
+    _state["task"] = asyncio.get_running_loop().create_task(_run())
+
+
+# Stop the flusher once it has written out what's left; later enqueues
+# write through
+async def stop():
+    task = _state["task"]
+    _state["task"] = None
+    if task is None:
+        return
+    _state["wakeup"].set()
+    try:
+        await task
+    except Exception as e:
+        logger.warning(f"Write buffer flusher failed: {str(e)}")
+    # Retries a final flush that failed
+    await flush()
+    if _size():
+        logger.error(f"Buffered writes lost on shutdown: {_size()}")
+
+
+def stats() -> dict:
+    return {
+        "enabled": settings.WRITE_BUFFER_ENABLED,
+        "running": is_running(),
+        "pending": {collection: len(documents) for collection, documents in _pending.items()},
+        "max_pending": settings.WRITE_BUFFER_MAX_PENDING,
+        **_counters,
+    }
@@ -30,6 +30,7 @@ from apify_client import ApifyClient
 import logging
 from pathlib import Path
 from dotenv import load_dotenv
+from services import llm_telemetry, rate_limiter, singleflight
 
 load_dotenv()
 
@@ -71,6 +72,15 @@ tavily_api_key = os.getenv("TAVILY_API_KEY")
 pplx_key = os.getenv("PPLX_API_KEY")
 
 async def find_competitors_perplexity(name: str, website: str) -> List[CompetitorInfo]:
+    return await singleflight.do(
+        singleflight.make_key("perplexity_pdf", name, singleflight.normalize_url(website)),
+        lambda: _find_competitors_perplexity(name, website),
+        encode=lambda competitors: [comp.dict() for comp in competitors],
+        decode=lambda competitors: [CompetitorInfo(**comp) for comp in competitors],
+    )
+
+
+async def _find_competitors_perplexity(name: str, website: str) -> List[CompetitorInfo]:
     chat_perplexity = ChatPerplexity(pplx_api_key=pplx_key)
     prompt = f"""As an industry expert, identify and describe five main competitors for {name} (website: {website}).
     Focus on companies that offer similar products or services. Provide detailed and accurate information for each competitor.
@@ -88,7 +98,12 @@ async def find_competitors_perplexity(name: str, website: str) -> List[Competito
     """
     messages = [HumanMessage(content=prompt)]
     try:
-        response = await chat_perplexity.ainvoke(messages)
+        await rate_limiter.acquire("perplexity", pplx_key)
+        async with llm_telemetry.track("chat", "perplexity", chat_perplexity.model) as call:
+            response = await chat_perplexity.ainvoke(messages)
+            # ChatPerplexity doesn't report usage: estimate it at about four characters per token
+            usage = response.usage_metadata or {"input_tokens": len(prompt) // 4, "output_tokens": len(response.content) // 4}
+            call.set_usage(usage.get("input_tokens"), usage.get("output_tokens"))
         json_start = response.content.find('[')
         json_end = response.content.rfind(']') + 1
         if json_start != -1 and json_end != -1:
@@ -367,6 +382,7 @@ class DetailedWebScraper:
     async def scrape_with_jina(url: str):
         headers = {"Authorization": f"Bearer {jina_api_key}"}
         try:
+            await rate_limiter.acquire("jina", jina_api_key)
             async with httpx.AsyncClient() as client:
                 response = await client.post("https://r.jina.ai", json={"url": url}, headers=headers)
             return response.json() if response.status_code == 200 else await DetailedWebScraper.fallback_scraper(url)
@@ -409,8 +425,9 @@ def parse_tavily_result(result: Any) -> List[TavilySearchResult]:
 async def search_with_tavily(urls: List[str]) -> List[List[TavilySearchResult]]:
     tavily_client = TavilyClient(api_key=tavily_api_key)
 
-    async def search_url(url):
+    async def fetch_url(url):
         try:
+            await rate_limiter.acquire("tavily", tavily_api_key)
             result = await asyncio.to_thread(tavily_client.get_search_context, url, search_depth="advanced")
             parsed_result = parse_tavily_result(result)
             return parsed_result
@@ -418,6 +435,16 @@ async def search_with_tavily(urls: List[str]) -> List[List[TavilySearchResult]]:
             logger.error(f"Error in Tavily search for {url}: {str(e)}")
             return []
 
+    async def search_url(url):
+        return await singleflight.do(
+            singleflight.make_key("tavily", singleflight.normalize_url(url)),
+            lambda: fetch_url(url),
+            encode=lambda results: [result.dict() for result in results],
+            decode=lambda results: [TavilySearchResult(**result) for result in results],
+            # fetch_url returns [] on errors
+            should_share=bool,
+        )
+
     return await asyncio.gather(*[search_url(url) for url in urls])
 
 class SocialMediaScraper:
@@ -503,10 +530,12 @@ class SocialMediaScraper:
                     run_input = {"profiles": [url]}
 
                 # Faz a chamada ao scraper da Apify
+                await rate_limiter.acquire("apify", os.getenv("APIFY_API_TOKEN"))
                 run = apify_client.actor(scraper_id).call(run_input=run_input)
 
                 if run.get("status") == "SUCCEEDED":
                     dataset_id = run.get("defaultDatasetId")
+                    await rate_limiter.acquire("apify", os.getenv("APIFY_API_TOKEN"))
                     items = apify_client.dataset(dataset_id).list_items().items
                     return items[:5]
                 else:
@@ -587,6 +616,7 @@ def process_pdf_task(project_id: str, folder_name: str, project_data: dict):
 
         # Atualiza Notion
         notion_data = {"properties": {"Approved": {"checkbox": True}}}
+        rate_limiter.acquire_sync("notion", os.getenv("NOTION_API_KEY"))
         response = requests.patch(f"{NOTION_API_URL}/{project_id}",
                                   headers=headers,
                                   json=notion_data)
@@ -1,61 +1,40 @@
 from datetime import datetime
-import os
 import uuid
 from pathlib import Path
 from zoneinfo import ZoneInfo
 from fastapi import UploadFile, HTTPException
-from openai import OpenAI
-from pymongo import MongoClient
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-# MongoDB connection
-mongodb_client = MongoClient(os.getenv("MONGODB_URI"))
-db = mongodb_client[os.getenv("DATABASE_NAME")]
+from services import openai_client, write_buffer
 
 # Audio directory (created in main)
 audio_dir = Path(__file__).parent / "audio_files"
 
 # Function to transcribe audio using OpenAI
 async def transcribe_audio(voice_file: UploadFile):
-    input_webm_path = Path(__file__).parent / "input_audio.webm"
-    with open(input_webm_path, "wb") as f:
-        f.write(await voice_file.read())
+    # Keep the upload in memory: a shared temp file would be clobbered by
+    # concurrent requests now that transcription no longer blocks the loop
+    audio_bytes = await voice_file.read()
 
-    if input_webm_path.stat().st_size == 0:
+    if len(audio_bytes) == 0:
         raise HTTPException(status_code=500, detail="The webm file is empty or corrupted.")
     
-    with open(input_webm_path, "rb") as audio_file:
-        speech_to_text_response = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file
-        )
-    
-    return speech_to_text_response.text
+    return await openai_client.transcribe_audio(("input_audio.webm", audio_bytes), model="whisper-1")
 
 # Function to process the text using OpenAI (or another bot)
 async def generate_text_from_bot(transcribed_text: str, bot_model: str = "gpt-3.5-turbo"):
     if bot_model == "openai":
-        chat_response = client.chat.completions.create(
+        return await openai_client.chat_completion(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "You are an AI assistant."},
                 {"role": "user", "content": transcribed_text}
             ]
         )
-        return chat_response.choices[0].message.content
     else:
         raise HTTPException(status_code=400, detail=f"Unknown bot model: {bot_model}")
 
 # Function to generate audio from text
 async def generate_audio_from_text(text: str, voice: str = "alloy"):
-    response = client.audio.speech.create(
-        model="tts-1",
-        voice=voice,
-        input=text,
-        response_format="mp3"
-    )
-    return response.read()
+    return await openai_client.synthesize_speech(text, voice=voice, model="tts-1", response_format="mp3")
 
 
 # Function to save the audio and return the correct UR
@@ -78,8 +57,9 @@ async def save_conversation_to_db(transcribed_text: str, generated_text: str, au
         "created_at": datetime.now(ZoneInfo("UTC"))
     }
     try:
-        result = db.conversations.insert_one(conversation)
-        return str(result.inserted_id)
+        # Written behind the request, in batches
+        conversation_id = await write_buffer.enqueue("conversations", conversation)
+        return str(conversation_id)
     except Exception as e:
         print(f"Error inserting into MongoDB: {e}")
         raise HTTPException(status_code=500, detail="Database error")
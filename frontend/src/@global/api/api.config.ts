@@ -9,4 +9,13 @@ const api = axios.create({
   },
 });
 
+// Sends the access token of the logged-in user, if any
+api.interceptors.request.use((config) => {
+  const token = localStorage.getItem("token");
+  if (token) {
+    config.headers.Authorization = `Bearer ${token}`;
+  }
+  return config;
+});
+
 export default api;
@@ -0,0 +1,19 @@
+import { BusinessResponse } from "../../../@types/ApiResponses";
+import api from "../../api.config";
+import { queryClient } from "../../queryclient";
+
+// Full analysis of one business (scraped websites, social media posts,
+// competitors): the list only carries the summary fields. Cached by id, so
+// opening the same row again or exporting it doesn't refetch.
+export async function getBusinessAnalysis(id: string): Promise<BusinessResponse> {
+  return await queryClient.fetchQuery({
+    queryKey: ["get-business-analysis", id],
+    queryFn: async () => await endPoint(id),
+    staleTime: 60 * 1000,
+  });
+}
+
+async function endPoint(id: string): Promise<BusinessResponse> {
+  const { data } = await api.get(`/business/${id}/analysis`);
+  return data;
+}
@@ -1,6 +1,6 @@
 import { useQuery } from "@tanstack/react-query";
 import { BusinessResponse } from "../../../@types/ApiResponses";
-import api from "../../api.config";
+import { getAllPages } from "../../pagination";
 
 export const useListBusinessAnalytics = () => {
   const { data } = useQuery({
@@ -13,6 +13,7 @@ export const useListBusinessAnalytics = () => {
 };
 
 async function endPoint(): Promise<BusinessResponse[]> {
-  const { data } = await api.get("/business");
-  return data;
+  // Summary fields only: the modal and the exports load the full analysis of
+  // each row with getBusinessAnalysis
+  return await getAllPages<BusinessResponse>("/business");
 }
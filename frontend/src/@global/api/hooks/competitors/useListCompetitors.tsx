@@ -1,6 +1,6 @@
 import { useQuery } from "@tanstack/react-query";
 import { CompetitorsResponse } from "../../../@types/ApiResponses";
-import api from "../../api.config";
+import { getAllPages } from "../../pagination";
 
 export const useListCompetitors = () => {
   const { data } = useQuery({
@@ -12,6 +12,7 @@ export const useListCompetitors = () => {
 };
 
 async function endPoint(): Promise<CompetitorsResponse[]> {
-  const { data } = await api.get("/competitors");
-  return data;
+  return await getAllPages<CompetitorsResponse>("/competitors", {
+    fields: "name,website,social_media,brand_voice",
+  });
 }
\ No newline at end of file
@@ -0,0 +1,18 @@
+import api from "./api.config";
+
+// List endpoints return one page per request and the cursor of the next page
+// in the X-Next-Cursor header (absent on the last page)
+const NEXT_CURSOR_HEADER = "x-next-cursor";
+const PAGE_SIZE = 100;
+
+// Fetch every page of a list endpoint by following X-Next-Cursor
+export async function getAllPages<T>(url: string, params: Record<string, unknown> = {}): Promise<T[]> {
+  const items: T[] = [];
+  let cursor: string | undefined;
+  do {
+    const response = await api.get<T[]>(url, { params: { ...params, limit: PAGE_SIZE, cursor } });
+    items.push(...response.data);
+    cursor = response.headers[NEXT_CURSOR_HEADER] || undefined;
+  } while (cursor);
+  return items;
+}
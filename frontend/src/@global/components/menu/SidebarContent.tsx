@@ -4,14 +4,13 @@ import { VStack, Tooltip, IconButton, useColorModeValue } from "@chakra-ui/react
 import { FaHome, FaEdit, FaMicrophone, FaChartLine, FaBullhorn, FaCogs, FaBook, FaUserTie, FaSignOutAlt } from "react-icons/fa";
 import { MdAnalytics, MdGroup } from "react-icons/md";
 import { GiArtificialIntelligence } from "react-icons/gi";
-import axios from "axios";
 import createTheme from "../../../styles/theme";
 import { useAuth } from "../../../auth/AuthProvider";
+import { getAllPages } from "../../api/pagination";
 
 const SidebarContent: React.FC<{ onClose?: () => void }> = ({ onClose }) => {
   const location = useLocation();
   const [enabledDashboards, setEnabledDashboards] = useState<string[]>([]);
-  const apiUrl = import.meta.env.VITE_API_URL;
   const { logout } = useAuth();
 
   const theme = createTheme("brand1");
@@ -21,15 +20,15 @@ const SidebarContent: React.FC<{ onClose?: () => void }> = ({ onClose }) => {
 
   useEffect(() => {
     // Buscando dashboards habilitados
-    axios.get(`${apiUrl}/dashboards/`)
-      .then(response => {
-        const dashboards = response.data.filter((dashboard: any) => dashboard.enabled);
+    getAllPages<any>("/dashboards/")
+      .then(allDashboards => {
+        const dashboards = allDashboards.filter((dashboard: any) => dashboard.enabled);
         setEnabledDashboards(dashboards.map((d: any) => d.category)); 
       })
       .catch(error => {
         console.error("Error fetching dashboards", error);
       });
-  }, [apiUrl]);
+  }, []);
 
   const isActive = (path: string) => location.pathname === path;
 
@@ -26,6 +26,7 @@ import {
   TabPanel,
 } from "@chakra-ui/react";
 import { Edit2, Trash2 } from "lucide-react";
+import { getAllPages } from "../../../@global/api/pagination";
 
 interface CRM {
   id?: string;
@@ -61,13 +62,7 @@ const CRMSection: React.FC = () => {
     // Fetch all CRMs when the component mounts
     const fetchCRMs = async () => {
       try {
-        const response = await axios.get(`${API_BASE_URL}/crms`);
-        const data = response.data;
-        if (Array.isArray(data)) {
-          setCRMs(data);
-        } else {
-          setCRMs([]);
-        }
+        setCRMs(await getAllPages<CRM>("/crms"));
       } catch (error) {
         if (error instanceof Error) {
           toast({
@@ -8,6 +8,7 @@ import DashboardTable from "./components/DashboardTable";
 import EditDashboardModal from "./components/EditDashboardModal";
 import DeleteConfirmationModal from "./components/DeleteConfirmationModal"; 
 import createTheme from "../../styles/theme";
+import { getAllPages } from "../../@global/api/pagination";
 
 interface Dashboard {
   id: string; 
@@ -47,9 +48,9 @@ const AdminPanelPage = () => {
 
   // Fetch all dashboards from the backend
   useEffect(() => {
-    axios.get(`${apiUrl}/dashboards/`)
-      .then(response => {
-        setDashboards(response.data);
+    getAllPages<Dashboard>("/dashboards/")
+      .then(allDashboards => {
+        setDashboards(allDashboards);
       })
       .catch(() => {
         toast({
@@ -20,6 +20,8 @@ import BrandVoiceModal from "./BrandVoiceModal";
 import { DeleteCompetitorDialog } from "./DeleteCompetitorDialog";
 import { useListBusinessAnalytics } from "../../../@global/api/hooks/businessAnalytics/useListBusinessAnalytics";
 import { useDeleteBusinessAnalytics } from "../../../@global/api/hooks/businessAnalytics/useDeleteBusinessAnalytics";
+import { getBusinessAnalysis } from "../../../@global/api/hooks/businessAnalytics/useGetBusinessAnalysis";
+import { BusinessResponse } from "../../../@global/@types/ApiResponses";
 
 type SocialMediaPost = {
   id: string;
@@ -146,6 +148,26 @@ type BrandVoiceModalContent = {
   socialMediaSummary: SocialMediaSummaryType;
 };
 
+// Fields only returned by the full analysis (GET /business/{id}/analysis)
+const detailsOf = (item: BusinessResponse) => ({
+  competitors: Array.isArray(item.competitors) ? item.competitors : [],
+  competitorsWebsiteData: Array.isArray(item.competitors_website_data)
+    ? item.competitors_website_data.map((entry) => ({
+      url: entry.url,
+      content: entry.content,
+    }))
+    : [],
+  socialMediaSummary:
+    item.social_media_summary && typeof item.social_media_summary === 'object'
+      ? item.social_media_summary
+      : {},
+});
+
+const withDetails = async (competitor: CompetitorsType): Promise<CompetitorsType> => ({
+  ...competitor,
+  ...detailsOf(await getBusinessAnalysis(competitor.id)),
+});
+
 const CompetitorsList = ({ isLoading }: { isLoading: boolean }) => {
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [modalContent, setModalContent] = useState<BrandVoiceModalContent>({
@@ -164,6 +186,8 @@ const CompetitorsList = ({ isLoading }: { isLoading: boolean }) => {
   const [searchQuery, setSearchQuery] = useState("");
   const [competitorToDelete, setCompetitorToDelete] = useState<CompetitorsType | null>(null);
   const [currentPage, setCurrentPage] = useState(1);
+  const [loadingDetailsId, setLoadingDetailsId] = useState<string | null>(null);
+  const [isExporting, setIsExporting] = useState(false);
   const itemsPerPage = 5;
   const totalPages = Math.ceil(filteredCompetitors.length / itemsPerPage);
 
@@ -187,17 +211,10 @@ const CompetitorsList = ({ isLoading }: { isLoading: boolean }) => {
         socialMedia: item.social_media,
         product: item.product || "",
         location: item.location || "",
-        competitors: Array.isArray(item.competitors) ? item.competitors : [],
-        competitorsWebsiteData: Array.isArray(item.competitors_website_data)
-          ? item.competitors_website_data.map((entry) => ({
-            url: entry.url,
-            content: entry.content,
-          }))
-          : [],
-        socialMediaSummary:
-          item.social_media_summary && typeof item.social_media_summary === 'object'
-            ? item.social_media_summary
-            : {},
+        // Loaded when a row is opened or exported
+        competitors: [],
+        competitorsWebsiteData: [],
+        socialMediaSummary: {},
         websiteUrls: Array.isArray(item.website_urls) ? item.website_urls : [],
         extractedSocialLinks: Array.isArray(item.extracted_social_links)
           ? item.extracted_social_links
@@ -229,10 +246,21 @@ const CompetitorsList = ({ isLoading }: { isLoading: boolean }) => {
     }
   }, [deleteStatus]);
 
+  // The exports include the full analysis of every filtered row
+  const loadFilteredDetails = async () => {
+    setIsExporting(true);
+    try {
+      return await Promise.all(filteredCompetitors.map(withDetails));
+    } finally {
+      setIsExporting(false);
+    }
+  };
+
   // Exportação para JSON
-  const exportToJson = () => {
+  const exportToJson = async () => {
+    const rows = await loadFilteredDetails();
     const jsonString = `data:text/json;charset=utf-8,${encodeURIComponent(
-      JSON.stringify(filteredCompetitors)
+      JSON.stringify(rows)
     )}`;
     const link = document.createElement("a");
     link.href = jsonString;
@@ -241,8 +269,9 @@ const CompetitorsList = ({ isLoading }: { isLoading: boolean }) => {
   };
 
   // Exportação para Excel
-  const exportToExcel = () => {
-    const flattenedData = filteredCompetitors.map((competitor) => {
+  const exportToExcel = async () => {
+    const rows = await loadFilteredDetails();
+    const flattenedData = rows.map((competitor) => {
       const baseData = {
         id: competitor.id,
         name: competitor.name,
@@ -378,7 +407,8 @@ const CompetitorsList = ({ isLoading }: { isLoading: boolean }) => {
     const lineColor = rgb(0.8, 0.8, 0.8);
 
 
-    for (const competitor of filteredCompetitors) {
+    const rows = await loadFilteredDetails();
+    for (const competitor of rows) {
       let page = pdfDoc.addPage([pageWidth, pageHeight]);
       let yPosition = pageHeight - margin;
 
@@ -519,7 +549,17 @@ const CompetitorsList = ({ isLoading }: { isLoading: boolean }) => {
   };
 
   // Funções de manipulação de eventos
-  const handleViewBrandVoice = (competitor: CompetitorsType) => {
+  const handleViewBrandVoice = async (baseCompetitor: CompetitorsType) => {
+    setLoadingDetailsId(baseCompetitor.id);
+    let competitor: CompetitorsType;
+    try {
+      competitor = await withDetails(baseCompetitor);
+    } catch (error) {
+      console.error("Error loading the business analysis", error);
+      return;
+    } finally {
+      setLoadingDetailsId(null);
+    }
     setModalContent({
       website: competitor.website,
       product: competitor.product || "N/A",
@@ -567,13 +607,13 @@ const CompetitorsList = ({ isLoading }: { isLoading: boolean }) => {
     <Flex direction="column" border="1px solid" borderColor={darkBlue} p={4} w="100%" borderRadius="8px">
       {/* Botões de exportação */}
       <HStack mb={4}>
-        <Button onClick={exportToJson} bg={purple} color={white}>
+        <Button onClick={exportToJson} bg={purple} color={white} isLoading={isExporting}>
           Export to JSON
         </Button>
-        <Button onClick={exportToExcel} bg={purple} color={white}>
+        <Button onClick={exportToExcel} bg={purple} color={white} isLoading={isExporting}>
           Export to Excel
         </Button>
-        <Button onClick={exportToPdf} bg={purple} color={white}>
+        <Button onClick={exportToPdf} bg={purple} color={white} isLoading={isExporting}>
           Export to PDF
         </Button>
       </HStack>
@@ -653,6 +693,7 @@ const CompetitorsList = ({ isLoading }: { isLoading: boolean }) => {
                     _hover={{ bg: electricGreen }}
                     size="sm"
                     isDisabled={isLoading}
+                    isLoading={loadingDetailsId === competitor.id}
                   />
                 </Tooltip>
                 <Tooltip
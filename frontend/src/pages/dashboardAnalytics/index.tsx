@@ -13,7 +13,7 @@ import {
   StatHelpText,
   Progress,
 } from '@chakra-ui/react';
-import axios from 'axios';
+import { getAllPages } from '../../@global/api/pagination';
 import DashboardHeader from './components/DashboardHeader';
 import CompetitorSummary from './components/CompetitorSummary';
 import CompetitorComparison from './components/CompetitorComparison';
@@ -54,7 +54,6 @@ const DashboardAnalyticsPage: React.FC = () => {
   const [selectedCompetitor, setSelectedCompetitor] = useState<Competitor | null>(null);
   const [loading, setLoading] = useState(true);
   const toast = useToast();
-  const apiUrl = import.meta.env.VITE_API_URL;
 
   useEffect(() => {
     fetchCompetitors();
@@ -62,8 +61,7 @@ const DashboardAnalyticsPage: React.FC = () => {
 
   const fetchCompetitors = async () => {
     try {
-      const response = await axios.get(`${apiUrl}/competitors`);
-      setCompetitors(response.data);
+      setCompetitors(await getAllPages("/competitors"));
       setLoading(false);
     } catch (error) {
       console.error('Error fetching competitors:', error);
@@ -27,6 +27,7 @@ import EbookTitleForm from "./components/EbookTitleForm";
 import ChapterForm from "./components/ChapterForm";
 import ChapterAccordion from "./components/ChapterAccordion";
 import GeneratePDFButton from "./components/GeneratePDFButton";
+import { getAllPages } from "../../@global/api/pagination";
 
 interface Chapter {
   id: string;
@@ -74,9 +75,7 @@ const IntuitiveEbookCreationWizard: React.FC = () => {
   const fetchChapters = async () => {
     setIsLoading(true);
     try {
-      const response = await fetch(`${apiUrl}/ebooks/`);
-      const data = await response.json();
-      setChapters(data);
+      setChapters(await getAllPages("/ebooks/"));
     } catch (error) {
       toast({
         title: "Error",
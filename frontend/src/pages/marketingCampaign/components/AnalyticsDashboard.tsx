@@ -1,5 +1,4 @@
 import { useState, useEffect } from 'react';
-import axios from 'axios';
 import {
   Box,
   Flex,
@@ -32,6 +31,7 @@ import {
 import { FaChartBar, FaCalendarAlt, FaDollarSign } from 'react-icons/fa';
 import DatePicker from 'react-datepicker';
 import 'react-datepicker/dist/react-datepicker.css';
+import { getAllPages } from '../../../@global/api/pagination';
 import { IconType } from 'react-icons';
 
 interface Campaign {
@@ -66,7 +66,6 @@ const CampaignDashboard = () => {
   const [startDate, setStartDate] = useState<Date | undefined>(undefined);
   const [endDate, setEndDate] = useState<Date | undefined>(undefined);
   const [dateFilterType, setDateFilterType] = useState<'day' | 'month' | 'year'>('month');
-  const apiUrl = import.meta.env.VITE_API_URL;
 
   // Use brand colors instead of useColorModeValue
   const bgColor = brandColors.white;
@@ -78,9 +77,9 @@ const CampaignDashboard = () => {
   useEffect(() => {
     const fetchCampaigns = async () => {
       try {
-        const response = await axios.get(`${apiUrl}/campaigns/`);
-        setCampaigns(response.data);
-        setFilteredCampaigns(response.data);
+        const allCampaigns = await getAllPages<Campaign>("/campaigns/");
+        setCampaigns(allCampaigns);
+        setFilteredCampaigns(allCampaigns);
       } catch (error) {
         console.error('Error fetching campaigns:', error);
       }